@@ -4,7 +4,13 @@ __init__.py
 This module creates a variable app_views which is an instance of Blueprint
 """
 
-from flask import Blueprint
+import base64
+from datetime import datetime
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask import stream_with_context
+import json
+from models import storage
+from models.base_model import time
 
 app_views = Blueprint('app_views', __name__, url_prefix='/api/v1')
 state_views = Blueprint('state_views', __name__, url_prefix='/api/v1/states')
@@ -13,6 +19,112 @@ place_views = Blueprint('place_views', __name__, url_prefix='/api/v1/places')
 city_views = Blueprint('city_views', __name__, url_prefix='/api/v1/cities')
 user_views = Blueprint('user_views', __name__, url_prefix='/api/v1/users')
 
+# number of objects in a page when only a cursor is given, and the most a
+# page can hold
+page_size = 100
+page_max = 1000
+
+
+def stream_list(objects, batch_size=100):
+    """
+    Returns a response streaming the JSON list of the dictionaries of
+    objects, serializing batch_size objects at a time instead of building
+    the whole list
+    """
+    def generate():
+        """yields the JSON list one batch of objects at a time"""
+        batch = []
+        opening = "["
+        for obj in objects:
+            batch.append(current_app.json.dumps(obj.to_dict()))
+            if len(batch) == batch_size:
+                yield opening + ",".join(batch)
+                opening = ","
+                batch = []
+        if batch:
+            yield opening + ",".join(batch)
+            opening = ","
+        yield "[]\n" if opening == "[" else "]\n"
+    return current_app.response_class(stream_with_context(generate()),
+                                      mimetype=current_app.json.mimetype)
+
+
+def encode_cursor(obj):
+    """returns the opaque cursor of the page that starts after obj"""
+    data = json.dumps([obj.created_at.strftime(time), obj.id])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """returns the (created_at, id) the page of cursor starts after"""
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.strptime(created_at, time), str(id)
+    except (TypeError, ValueError):
+        abort(400, "Not a valid cursor")
+
+
+def stream_page(query):
+    """
+    Returns a response streaming the objects of query, or one page of them
+    in (created_at, id) order when the request has a limit or a cursor
+    argument. A full page has an X-Next-Cursor header, the cursor argument
+    of the next page, which the storage seeks to through an index.
+    """
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limit is None and cursor is None:
+        return stream_list(query)
+    try:
+        limit = int(limit or page_size)
+    except ValueError:
+        abort(400, "Not a valid limit")
+    if not 0 < limit <= page_max:
+        abort(400, "Not a valid limit")
+    query = query.order_by("created_at", "id")
+    if cursor:
+        query = query.after(*decode_cursor(cursor))
+    objects = query.limit(limit + 1).all()
+    response = stream_list(objects[:limit])
+    if len(objects) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(objects[limit - 1])
+    return response
+
+
+def create_many(cls, records, required):
+    """
+    Returns the response creating an object of cls for each dictionary of
+    the JSON list records, saved together in one write or commit, once
+    every one has the attributes required
+    """
+    if not records or not all(isinstance(record, dict)
+                              for record in records):
+        abort(400, "Not a JSON")
+    for attr in required:
+        if not all(attr in record for record in records):
+            abort(400, "Missing {}".format(attr))
+    objects = [cls(**record) for record in records]
+    storage.new_many(objects)
+    storage.save()
+    return jsonify([obj.to_dict() for obj in objects]), 201
+
+
+def delete_many(cls, ids):
+    """
+    Returns the response deleting the objects of cls whose ids are in the
+    JSON list ids, saved together in one write or commit, once every one
+    is found
+    """
+    if not isinstance(ids, list) or not all(isinstance(id, str)
+                                            for id in ids):
+        abort(400, "Not a JSON")
+    objects = [storage.get(cls, id) for id in dict.fromkeys(ids)]
+    if None in objects:
+        abort(404)
+    storage.delete_many(objects)
+    storage.save()
+    return jsonify({})
+
 
 from api.v1.views.index import *
 from api.v1.views.cities import *
@@ -5,7 +5,7 @@ all default RESTFul API actions
 """
 
 from flask import jsonify, abort, request
-from api.v1.views import amenity_views
+from api.v1.views import amenity_views, create_many, delete_many, stream_page
 from models import storage
 from models.amenity import Amenity
 
@@ -13,11 +13,7 @@ from models.amenity import Amenity
 @amenity_views.route("/", methods=["GET"], strict_slashes=False)
 def list_amenities():
     """Retrieves the list of all Amenity objects"""
-    amenities_objs = storage.all(Amenity)
-    amenities_list = []
-    for amenity in amenities_objs.values():
-        amenities_list.append(amenity.to_dict())
-    return jsonify(amenities_list)
+    return stream_page(storage.query(Amenity))
 
 
 @amenity_views.route("/<amenity_id>", methods=["GET"], strict_slashes=False)
@@ -42,10 +38,20 @@ def delete_amenity(amenity_id):
     return jsonify({})
 
 
+@amenity_views.route("/", methods=["DELETE"], strict_slashes=False)
+def delete_amenities():
+    """Deletes the Amenity objects whose ids are in the JSON list of the
+    request"""
+    return delete_many(Amenity, request.get_json(silent=True))
+
+
 @amenity_views.route("/", methods=["POST"], strict_slashes=False)
 def create_amenity():
-    """Creates a new Amenity and stores it"""
+    """Creates a new Amenity and stores it, or one per dictionary of a JSON
+    list"""
     amenity_data = request.get_json()
+    if isinstance(amenity_data, list):
+        return create_many(Amenity, amenity_data, ["name"])
     if not amenity_data:
         abort(400, "Not a JSON")
     if 'name' not in amenity_data:
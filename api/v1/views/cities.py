@@ -6,7 +6,7 @@ handles all default RESTFul API actions
 """
 
 from flask import jsonify, request, abort
-from api.v1.views import app_views
+from api.v1.views import app_views, stream_page
 from markupsafe import escape
 from models import storage
 from models.city import City
@@ -19,19 +19,10 @@ from os import environ, getenv
 def get_state_cities(state_id):
     """ Retrieves the list of all City objects of a State """
     state_id_cln = escape(state_id)
-    key = "State." + state_id_cln
-    output = []
 
-    objs = storage.all(State)
-    if key in objs:
-        state = objs[key]
-        retrieved = state.cities
-
-        if retrieved:
-            for city in retrieved:
-                output.append(city.to_dict())
-
-        return jsonify(output)
+    state = storage.get(State, state_id_cln)
+    if state is not None:
+        return stream_page(storage.query(City).filter(state_id=state.id))
     else:
         abort(404)
 
@@ -40,12 +31,11 @@ def get_state_cities(state_id):
 def get_city(city_id):
     """ Retrieves a City object """
     city_id_cln = escape(city_id)
-    key = "City." + city_id_cln
 
-    objs = storage.all(City)
+    city = storage.get(City, city_id_cln)
 
-    if key in objs:
-        return jsonify(objs[key].to_dict())
+    if city is not None:
+        return jsonify(city.to_dict())
     else:
         abort(404)
 
@@ -54,13 +44,11 @@ def get_city(city_id):
 def delete_city(city_id):
     """ Deletes a City object """
     city_id_cln = escape(city_id)
-    key = "City." + city_id_cln
 
-    objs = storage.all(City)
-    obj_keys = objs.keys()
+    city = storage.get(City, city_id_cln)
 
-    if key in obj_keys:
-        objs[key].delete()
+    if city is not None:
+        city.delete()
         storage.save()
         return jsonify({})
     else:
@@ -86,11 +74,9 @@ def create_city(state_id):
         abort(400, description="Missing name")
 
     state_id_cln = escape(state_id)
-    key = "State." + state_id_cln
 
-    objs = storage.all(State)
-    obj_keys = objs.keys()
-    if key in obj_keys:
+    state = storage.get(State, state_id_cln)
+    if state is not None:
         new_city = City(**json_data)
         setattr(new_city, "state_id", state_id_cln)
         new_city.save()
@@ -114,19 +100,17 @@ def update_city(city_id):
         abort(400, description="Not a JSON")
 
     city_id_cln = escape(city_id)
-    key = "City." + city_id_cln
 
-    objs = storage.all(City)
-    obj_keys = objs.keys()
+    city = storage.get(City, city_id_cln)
 
-    if key in obj_keys:
+    if city is not None:
         skip = ["id", "state_id", "created_at", "updated_at"]
         for data in json_data.keys():
             if data in skip:
                 continue
             else:
-                setattr(objs[key], data, json_data[data])
-        objs[key].save()
-        return jsonify(objs[key].to_dict())
+                setattr(city, data, json_data[data])
+        city.save()
+        return jsonify(city.to_dict())
     else:
         abort(404)
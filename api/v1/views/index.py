@@ -19,11 +19,12 @@ def show_status():
 @app_views.route("/stats", methods=["GET"])
 def show_stats():
     """ returns a JSON that displays the number of each object by type"""
-    statistics = {"amenities": storage.count("Amenity"),
-                  "cities": storage.count("City"),
-                  "places": storage.count("Place"),
-                  "reviews": storage.count("Review"),
-                  "states": storage.count("State"),
-                  "users": storage.count("User")}
+    counts = storage.counts()
+    statistics = {"amenities": counts["Amenity"],
+                  "cities": counts["City"],
+                  "places": counts["Place"],
+                  "reviews": counts["Review"],
+                  "states": counts["State"],
+                  "users": counts["User"]}
 
     return jsonify(statistics)
@@ -4,15 +4,17 @@ This module handles the view for Place objects that handles
 all default RESTFul API actions
 """
 from flask import jsonify, abort, request
-from api.v1.views import place_views, city_views, app_views
+from api.v1.views import place_views, city_views, app_views, stream_page
 from models import storage
 from models.place import Place
 from models.city import City
 from models.user import User
-from models.state import State
 from models.amenity import Amenity
 from os import getenv
 
+# numeric attributes of Place that places_search filters by range
+ranged = ("max_guest", "number_bathrooms", "number_rooms", "price_by_night")
+
 
 @city_views.route("/<string:city_id>/places", methods=["GET"],
                   strict_slashes=False)
@@ -21,13 +23,7 @@ def list_places(city_id):
     city = storage.get("City", city_id)
     if city is None:
         abort(404)
-    places_list = []
-    places = storage.all(Place)
-    for place in places.values():
-        if place.city_id == city_id:
-            places_list.append(place.to_dict())
-
-    return jsonify(places_list)
+    return stream_page(storage.query(Place).filter(city_id=city.id))
 
 
 @place_views.route("/<string:place_id>", methods=["GET"], strict_slashes=False)
@@ -104,6 +100,10 @@ def update_place(place_id):
 def places_search():
     """ Retrieves all Place objects depending of the JSON
     in the body of the request.
+
+    max_guest, number_bathrooms, number_rooms and price_by_night can be
+    given as {"min": <number>, "max": <number>} (both optional) to only
+    retrieve the places whose attribute is within the range.
     """
     try:
         json_data = request.get_json()
@@ -113,55 +113,65 @@ def places_search():
     if not request.is_json:
         abort(400, "Not a JSON")
 
+    ranges = {}
     if json_data:
+        if not isinstance(json_data, dict):
+            abort(400, "Not a JSON")
         states = json_data.get('states', None)
         cities = json_data.get('cities', None)
         amenities = json_data.get('amenities', None)
+        for ids in (states, cities, amenities):
+            if ids is not None and \
+                    (not isinstance(ids, list) or
+                     not all(isinstance(id, str) for id in ids)):
+                abort(400, "Not a valid list of ids")
+        for attr in ranged:
+            bounds = json_data.get(attr, None)
+            if bounds is None:
+                continue
+            if not isinstance(bounds, dict):
+                abort(400, "Not a valid range")
+            low = bounds.get("min", None)
+            high = bounds.get("max", None)
+            for bound in (low, high):
+                if bound is not None and \
+                        (not isinstance(bound, (int, float)) or
+                         isinstance(bound, bool)):
+                    abort(400, "Not a valid range")
+            if low is not None:
+                ranges[attr + "__ge"] = low
+            if high is not None:
+                ranges[attr + "__le"] = high
+    query = storage.query(Place).filter(**ranges)
 
     if not json_data or (not states and not cities and
                          not amenities):
-        places = storage.all(Place).values()
         places_list = []
-        for place in places:
+        for place in query:
             places_list.append(place.to_dict())
         return jsonify(places_list)
 
-    places_list = []
+    if amenities:
+        query = query.load("amenities")
+    city_ids = {}
     if states:
-        for state_id in states:
-            state = storage.get(State, state_id)
-            if state:
-                for city in state.cities:
-                    if city:
-                        places_list.extend(city.places)
+        for city in storage.query(City).filter(state_id__in=states):
+            city_ids[city.id] = None
     if cities:
-        city_objs = []
         for city_id in cities:
-            city = storage.get(City, city_id)
-            if city:
-                city_objs.append(city)
-        for city in city_objs:
-            if city:
-                for place in city.places:
-                    if place not in places_list:
-                        places_list.append(place)
+            city_ids[city_id] = None
+    places_list = []
+    if city_ids:
+        places_list = query.filter(city_id__in=list(city_ids)).all()
     if amenities:
         if not places_list:
-            places_list = storage.all(Place).values()
-        amenity_objs = []
-        for amenity_id in amenities:
-            amenity = storage.get(Amenity, amenity_id)
-            if amenity:
-                amenity_objs.append(amenity)
+            places_list = query.all()
+        amenity_ids = {amenity.id for amenity in
+                       storage.query(Amenity).filter(id__in=amenities)}
 
         new_places_list = []
         for place in places_list:
-            all_amenities_present = True
-            for amenity in amenity_objs:
-                if amenity not in place.amenities:
-                    all_amenities_present = False
-                    break
-            if all_amenities_present:
+            if amenity_ids <= {amenity.id for amenity in place.amenities}:
                 new_places_list.append(place)
 
         places_list = new_places_list
@@ -7,10 +7,10 @@ handles all default RESTFul API actions
 
 from flask import jsonify, request, abort
 from api.v1.views import app_views
+import models
 from models import storage
 from models.amenity import Amenity
 from models.place import Place
-from os import getenv, environ
 
 
 @app_views.route("/places/<place_id>/amenities", methods=["GET"],
@@ -24,7 +24,7 @@ def get_place_amenities(place_id):
     if place is None:
         abort(404)
 
-    if "HBNB_TYPE_STORAGE" in environ and getenv("HBNB_TYPE_STORAGE") == "db":
+    if models.storage_t == "db":
         amenities = place.amenities
         for amenity in amenities:
             output.append(amenity.to_dict())
@@ -49,7 +49,7 @@ def delete_amenity(place_id, amenity_id):
     if amenity is None:
         abort(404)
 
-    if "HBNB_TYPE_STORAGE" in environ and getenv("HBNB_TYPE_STORAGE") == "db":
+    if models.storage_t == "db":
         amenities = place.amenities
         if amenity not in amenities:
             abort(404)
@@ -58,7 +58,7 @@ def delete_amenity(place_id, amenity_id):
         amenity_ids = place.amenity_ids
         if amenity_id not in amenity_ids:
             abort(404)
-        amenity_ids.remove(amenity_id)
+        place.amenity_ids = [i for i in amenity_ids if i != amenity_id]
 
     place.save()
     return jsonify({}), 200
@@ -76,7 +76,7 @@ def create_amenity(place_id, amenity_id):
     if amenity is None:
         abort(404)
 
-    if "HBNB_TYPE_STORAGE" in environ and getenv("HBNB_TYPE_STORAGE") == "db":
+    if models.storage_t == "db":
         amenities = place.amenities
         if amenity in amenities:
             return jsonify(amenity.to_dict()), 200
@@ -85,7 +85,7 @@ def create_amenity(place_id, amenity_id):
         amenity_ids = place.amenity_ids
         if amenity_id in amenity_ids:
             return jsonify(amenity.to_dict()), 200
-        amenity_ids.append(amenity_id)
+        place.amenity_ids = amenity_ids + [amenity_id]
 
     place.save()
     return jsonify(amenity.to_dict()), 201
@@ -6,7 +6,7 @@ handles all default RESTFul API actions
 """
 
 from flask import jsonify, request, abort
-from api.v1.views import app_views
+from api.v1.views import app_views, stream_page
 from markupsafe import escape
 from models import storage
 from models.review import Review
@@ -18,18 +18,11 @@ from models.user import User
                  strict_slashes=False)
 def get_place_reviews(place_id):
     """ Retrieves the list of all Review objects of a Place """
-    output = []
-
     place = storage.get(Place, place_id)
     if place is None:
         abort(404)
 
-    reviews = storage.all(Review)
-    for review in reviews.values():
-        if review.place_id == place.id:
-            output.append(review.to_dict())
-
-    return jsonify(output)
+    return stream_page(storage.query(Review).filter(place_id=place.id))
 
 
 @app_views.route("/reviews/<string:review_id>", methods=["GET"],
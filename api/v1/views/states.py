@@ -5,7 +5,7 @@ all default RESTFul API actions
 """
 
 from flask import jsonify, abort, request
-from api.v1.views import state_views
+from api.v1.views import state_views, create_many, delete_many, stream_page
 from models import storage
 from models.state import State
 
@@ -13,11 +13,7 @@ from models.state import State
 @state_views.route("/", methods=["GET"], strict_slashes=False)
 def list_states():
     """Retrieves the list of all State objects"""
-    states_objs = storage.all(State)
-    states_list = []
-    for state in states_objs.values():
-        states_list.append(state.to_dict())
-    return jsonify(states_list)
+    return stream_page(storage.query(State))
 
 
 @state_views.route("/<state_id>", methods=["GET"], strict_slashes=False)
@@ -42,10 +38,20 @@ def delete_state(state_id):
     return jsonify({})
 
 
+@state_views.route("/", methods=["DELETE"], strict_slashes=False)
+def delete_states():
+    """Deletes the State objects whose ids are in the JSON list of the
+    request"""
+    return delete_many(State, request.get_json(silent=True))
+
+
 @state_views.route("/", methods=["POST"], strict_slashes=False)
 def create_state():
-    """Creates a new State and stores it"""
+    """Creates a new State and stores it, or one per dictionary of a JSON
+    list"""
     state_data = request.get_json()
+    if isinstance(state_data, list):
+        return create_many(State, state_data, ["name"])
     if not state_data:
         abort(400, "Not a JSON")
     if 'name' not in state_data:
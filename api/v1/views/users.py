@@ -6,7 +6,7 @@ handles all default RESTFul API actions
 """
 
 from flask import jsonify, abort, request
-from api.v1.views import user_views
+from api.v1.views import user_views, create_many, delete_many, stream_page
 from models import storage
 from models.user import User
 
@@ -14,11 +14,7 @@ from models.user import User
 @user_views.route("/", methods=["GET"], strict_slashes=False)
 def list_users():
     """Retrieves the list of all User objects"""
-    user_objs = storage.all(User)
-    users_list = []
-    for user in user_objs.values():
-        users_list.append(user.to_dict())
-    return jsonify(users_list)
+    return stream_page(storage.query(User))
 
 
 @user_views.route("/<user_id>", methods=["GET"], strict_slashes=False)
@@ -43,10 +39,20 @@ def delete_user(user_id):
     return jsonify({})
 
 
+@user_views.route("/", methods=["DELETE"], strict_slashes=False)
+def delete_users():
+    """Deletes the User objects whose ids are in the JSON list of the
+    request"""
+    return delete_many(User, request.get_json(silent=True))
+
+
 @user_views.route("/", methods=["POST"], strict_slashes=False)
 def create_user():
-    """Creates a new User and stores it"""
+    """Creates a new User and stores it, or one per dictionary of a JSON
+    list"""
     user_data = request.get_json()
+    if isinstance(user_data, list):
+        return create_many(User, user_data, ["email", "password"])
     if not user_data:
         abort(400, "Not a JSON")
     if 'email' not in user_data:
@@ -0,0 +1,5 @@
+#!/usr/bin/python3
+"""
+Benchmarks for the storage engines, run as modules from the repository root
+(e.g. python3 -m benchmarks.bench_file_storage)
+"""
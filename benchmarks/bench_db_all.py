@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""
+Benchmarks the queries and latency of DBStorage reading every object of
+every class from SQLite: all() fetching each table as one list (as before)
+or streamed, against counts() that loads no object and one count() per
+class
+
+usage: HBNB_TYPE_STORAGE=sqlite HBNB_SQLITE_PATH=/tmp/bench.db \\
+       python3 -m benchmarks.bench_db_all [rows]
+"""
+
+from datetime import datetime, timedelta
+import models
+from models.engine.db_storage import classes
+import sys
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def populate(engine, rows, batch_size=10000):
+    """fills the tables with rows rows in all, spread over every class,
+    by multi-row INSERTs"""
+    tables = {name: cls.__table__ for name, cls in classes.items()}
+    size = rows // 6
+    now = datetime(2020, 1, 1)
+
+    def records(prefix, **columns):
+        """yields the rows of one table, the columns given as functions
+        of the row number"""
+        for i in range(size):
+            row = {"id": "{}-{:08d}".format(prefix, i),
+                   "created_at": now + timedelta(seconds=i),
+                   "updated_at": now + timedelta(seconds=i)}
+            row.update({name: value(i) for name, value in columns.items()})
+            yield row
+
+    data = (("State", records("s", name=str)),
+            ("City", records("c", name=str,
+                             state_id="s-{:08d}".format)),
+            ("User", records("u", email=str, password=str)),
+            ("Amenity", records("a", name=str)),
+            ("Place", records("p", name=str, city_id="c-{:08d}".format,
+                              user_id="u-{:08d}".format)),
+            ("Review", records("r", text=str, place_id="p-{:08d}".format,
+                               user_id="u-{:08d}".format)))
+    with engine.begin() as connection:
+        for name, rows in data:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    connection.execute(tables[name].insert(), batch)
+                    batch = []
+            if batch:
+                connection.execute(tables[name].insert(), batch)
+
+
+def listed(storage):
+    """returns every object by key, fetching each table as one list"""
+    session = storage._DBStorage__session
+    objects = {}
+    for cls in classes.values():
+        for obj in session.query(cls).all():
+            objects[obj.__class__.__name__ + '.' + obj.id] = obj
+    return objects
+
+
+def counted(storage):
+    """returns the number of objects of each class, one query each"""
+    return {name: storage.count(cls) for name, cls in classes.items()}
+
+
+def main(rows=1000000):
+    """prints the number of queries and the latency of each way"""
+    if models.engine_t != "sqlite":
+        print("run with HBNB_TYPE_STORAGE=sqlite", file=sys.stderr)
+        sys.exit(1)
+    storage = models.storage
+    engine = storage.connect()
+    if storage.count() == 0:
+        populate(engine, rows)
+    engine.dispose()
+    queries = [0]
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def count_query(*args):
+        """counts the statements sent to the database"""
+        queries[0] += 1
+
+    print("{} rows".format(storage.count()))
+    print("{:>22} {:>8} {:>12}".format("", "queries", "ms"))
+    for label, function in (("all() as lists", lambda: listed(storage)),
+                            ("all() streamed", storage.all),
+                            ("count() per class", lambda: counted(storage)),
+                            ("counts()", storage.counts)):
+        storage.close()
+        queries[0] = 0
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        print("{:>22} {:>8} {:>12.1f}".format(label, queries[0], elapsed))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.close, called at the end of every API request:
+a full reload (as before), close when the file did not change, and close
+after another writer changed one record of the file, or appended one to the
+journal
+
+usage: python3 -m benchmarks.bench_file_close [size ...]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def timed(function, runs=5):
+    """returns the average time in ms of a call to function"""
+    start = time.perf_counter()
+    for i in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main(sizes):
+    """prints the close latency of each case for each store size"""
+    storage = FileStorage()
+    path = os.path.join(tempfile.mkdtemp(), "file.json")
+    FileStorage._FileStorage__file_path = path
+    print("{:>10} {:>12} {:>12} {:>12} {:>12}".format(
+        "objects", "reload ms", "unchanged ms", "1 change ms",
+        "journaled ms"))
+    for size in sizes:
+        FileStorage._FileStorage__journal_path = None
+        FileStorage._FileStorage__objects = {}
+        for i in range(size):
+            storage.new(Review(place_id="place", text=str(i)))
+        storage.save()
+        key = next(iter(FileStorage._FileStorage__objects))
+
+        def change():
+            """rewrites the file with one record changed, as another
+            process would, then closes"""
+            with open(path) as f:
+                js = json.load(f)
+            js[key]["text"] = str(time.time())
+            with open(path, "w") as f:
+                json.dump(js, f)
+            start = time.perf_counter()
+            storage.close()
+            return time.perf_counter() - start
+
+        def append():
+            """appends one changed record to the journal, as another
+            process would, then closes"""
+            obj = FileStorage._FileStorage__objects[key].to_dict(False)
+            obj["text"] = str(time.time())
+            with open(path + ".log", "a") as f:
+                f.write(json.dumps({"op": "new", "key": key, "obj": obj}))
+                f.write("\n")
+            start = time.perf_counter()
+            storage.close()
+            return time.perf_counter() - start
+
+        reload = timed(storage.reload)
+        unchanged = timed(storage.close, 1000)
+        changed = sum(change() for i in range(5)) / 5 * 1000
+        FileStorage._FileStorage__journal_path = path + ".log"
+        storage.compact()
+        journaled = sum(append() for i in range(5)) / 5 * 1000
+        print("{:>10} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f}".format(
+            size, reload, unchanged, changed, journaled))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Benchmarks the storage file formats of FileStorage on the same dataset:
+time to save every object, time to reload them, and size of the file
+
+usage: python3 -m benchmarks.bench_file_formats [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+def build(size):
+    """adds about size states, cities, users, places and reviews to the
+    storage, linked by their foreign keys"""
+    storage = FileStorage()
+    FileStorage._FileStorage__objects = {}
+    states = [State(name="state_{}".format(i)) for i in range(10)]
+    cities = [City(state_id=states[i % 10].id, name="city_{}".format(i))
+              for i in range(100)]
+    users = [User(email="user_{}@hbnb.io".format(i), first_name="first",
+                  last_name="last") for i in range(size // 10)]
+    places = [Place(city_id=cities[i % 100].id,
+                    user_id=users[i % len(users)].id,
+                    name="place_{}".format(i), description="a nice place",
+                    number_rooms=i % 5, number_bathrooms=1, max_guest=4,
+                    price_by_night=100 + i % 50, latitude=37.77,
+                    longitude=-122.41)
+              for i in range(size * 3 // 10)]
+    reviews = [Review(place_id=places[i % len(places)].id,
+                      user_id=users[i % len(users)].id, text="great stay")
+               for i in range(size - len(users) - len(places) - 110)]
+    for obj in states + cities + users + places + reviews:
+        storage.new(obj)
+    return storage
+
+
+def main(size=100000):
+    """prints the save time, reload time and file size of each format"""
+    storage = build(size)
+    objects = FileStorage._FileStorage__objects
+    tmp = tempfile.mkdtemp()
+    print("{} objects".format(len(objects)))
+    print("{:>8} {:>10} {:>10} {:>10}".format("format", "save s",
+                                              "reload s", "size MiB"))
+    for name, ext in (("json", ".json"), ("jsonl", ".jsonl"),
+                      ("binary", ".bin")):
+        path = os.path.join(tmp, "file" + ext)
+        FileStorage._FileStorage__file_path = path
+        FileStorage._FileStorage__objects = objects
+        storage.count(State)
+        FileStorage._FileStorage__dirty.update(objects)
+        start = time.perf_counter()
+        storage.save()
+        saved = time.perf_counter() - start
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        storage.reload()
+        reloaded = time.perf_counter() - start
+        print("{:>8} {:>10.3f} {:>10.3f} {:>10.1f}".format(
+            name, saved, reloaded, os.path.getsize(path) / 1024 / 1024))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
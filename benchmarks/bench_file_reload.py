@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.reload: cold start time and peak memory when every
+object is materialized against the lazy mode
+
+usage: python3 -m benchmarks.bench_file_reload [size]
+"""
+
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+def write_store(path, size):
+    """saves size places and reviews to path"""
+    FileStorage._FileStorage__file_path = path
+    storage = FileStorage()
+    FileStorage._FileStorage__objects = {}
+    for i in range(size // 2):
+        place = Place(name="place_{}".format(i), city_id="city")
+        storage.new(place)
+        storage.new(Review(place_id=place.id, text="review"))
+    storage.save()
+    FileStorage._FileStorage__objects = {}
+
+
+def resident():
+    """returns the resident memory of this process in MiB"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 1024 / 1024
+
+
+def reload(path, cache_size, results):
+    """reloads the store at path in this process and reports the time
+    taken, the growth of the peak RSS and the growth of the RSS once done"""
+    FileStorage._FileStorage__file_path = path
+    FileStorage._FileStorage__cache_size = cache_size
+    before = resident()
+    start = time.perf_counter()
+    FileStorage().reload()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((elapsed, peak - before, resident() - before))
+
+
+def main(size=100000):
+    """prints reload time and memory of both modes"""
+    path = os.path.join(tempfile.mkdtemp(), "file.json")
+    # every step runs in a fresh interpreter started from this small one,
+    # as the peak RSS of a process is inherited by its children
+    context = multiprocessing.get_context("spawn")
+    child = context.Process(target=write_store, args=(path, size))
+    child.start()
+    child.join()
+    print("{} objects".format(size))
+    print("{:>8} {:>10} {:>12} {:>12}".format("mode", "reload s",
+                                              "peak +MiB", "rss +MiB"))
+    for mode, cache_size in (("eager", None), ("lazy", 1000)):
+        results = context.Queue()
+        child = context.Process(target=reload,
+                                args=(path, cache_size, results))
+        child.start()
+        elapsed, peak, rss = results.get()
+        child.join()
+        print("{:>8} {:>10.3f} {:>12.1f} {:>12.1f}".format(
+            mode, elapsed, peak, rss))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
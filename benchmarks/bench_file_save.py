@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""
+Benchmarks the latency of saving one new object with FileStorage:
+rewriting the whole JSON file with every object serialized again (as
+before dirty tracking), rewriting it from the cached text of the unchanged
+objects, and appending to the journal
+
+usage: python3 -m benchmarks.bench_file_save [size ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def time_saves(storage, runs=10, uncached=False):
+    """returns the average time in ms to create and save one Review"""
+    total = 0
+    for i in range(runs):
+        if uncached:
+            FileStorage._FileStorage__dirty.update(
+                FileStorage._FileStorage__objects)
+        start = time.perf_counter()
+        Review(place_id="place", user_id="user", text=str(i)).save()
+        total += time.perf_counter() - start
+    return total / runs * 1000
+
+
+def main(sizes):
+    """prints the save latency of each mode for each store size"""
+    storage = FileStorage()
+    tmp = tempfile.mkdtemp()
+    FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+    journal = os.path.join(tmp, "file.json.log")
+    print("{:>10} {:>12} {:>12} {:>12}".format("objects", "full ms",
+                                               "cached ms", "journal ms"))
+    for size in sizes:
+        FileStorage._FileStorage__objects = {}
+        for i in range(size):
+            storage.new(Review(place_id="place", text=str(i)))
+        FileStorage._FileStorage__journal_path = None
+        full = time_saves(storage, uncached=True)
+        cached = time_saves(storage)
+        FileStorage._FileStorage__journal_path = journal
+        storage.compact()
+        journaled = time_saves(storage)
+        print("{:>10} {:>12.3f} {:>12.3f} {:>12.3f}".format(
+            size, full, cached, journaled))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Benchmarks the sharded FileStorage layout against the single JSON file:
+time and bytes written to save one new Review (the largest class) or one
+new State, and time to reload every object sequentially or with a pool of
+workers
+
+usage: python3 -m benchmarks.bench_file_shards [size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from benchmarks.bench_file_formats import build
+from models.engine.file_storage import FileStorage
+from models.review import Review
+from models.state import State
+
+
+def files(file_path, shards_path):
+    """returns the paths of the storage files"""
+    if shards_path is None:
+        return [file_path]
+    return [os.path.join(shards_path, name)
+            for name in os.listdir(shards_path)]
+
+
+def time_save(obj, file_path, shards_path):
+    """returns the time in ms to save obj and the KiB of the storage files
+    it rewrote (replaced by a new file)"""
+    before = {path: os.stat(path).st_ino
+              for path in files(file_path, shards_path)}
+    start = time.perf_counter()
+    obj.save()
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(path)
+               for path in files(file_path, shards_path)
+               if before.get(path) != os.stat(path).st_ino)
+    return elapsed * 1000, size / 1024
+
+
+def main(size=100000):
+    """prints the save and reload costs of each layout"""
+    storage = build(size)
+    objects = FileStorage._FileStorage__objects
+    tmp = tempfile.mkdtemp()
+    file_path = os.path.join(tmp, "file.json")
+    shards_path = os.path.join(tmp, "shards")
+    FileStorage._FileStorage__file_path = file_path
+    FileStorage._FileStorage__parallel_min = 0
+    print("{} objects, {} cpus".format(len(objects), os.cpu_count()))
+    print("{:>22} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "layout", "review ms", "review KiB", "state ms", "state KiB",
+        "reload s"))
+    for layout, shards, workers, pool in (
+            ("single file", None, 1, None),
+            ("shards", shards_path, 1, None),
+            ("shards, thread pool", shards_path, 4, "thread"),
+            ("shards, process pool", shards_path, 4, "process")):
+        FileStorage._FileStorage__shards_path = shards
+        FileStorage._FileStorage__reload_workers = workers
+        FileStorage._FileStorage__reload_pool = pool
+        FileStorage._FileStorage__objects = objects
+        storage.save()
+        review = time_save(Review(place_id="place", text="new"), file_path,
+                           shards)
+        state = time_save(State(name="new"), file_path, shards)
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        storage.reload()
+        reloaded = time.perf_counter() - start
+        objects = FileStorage._FileStorage__objects
+        print("{:>22} {:>10.2f} {:>10.0f} {:>10.2f} {:>10.0f} "
+              "{:>10.3f}".format(layout, *review, *state, reloaded))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
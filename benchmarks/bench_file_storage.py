@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.all(cls) for a small class while the store grows
+
+usage: python3 -m benchmarks.bench_file_storage [size ...]
+"""
+
+import sys
+import timeit
+from models.amenity import Amenity
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+
+
+def populate(storage, size):
+    """fills storage with 50 amenities and size places and reviews"""
+    for i in range(50):
+        storage.new(Amenity(name="amenity_{}".format(i)))
+    for i in range(size // 2):
+        place = Place(name="place_{}".format(i))
+        storage.new(place)
+        storage.new(Review(place_id=place.id, text="review"))
+
+
+def main(sizes):
+    """prints the average latency of all(Amenity) for each store size"""
+    storage = FileStorage()
+    print("{:>10} {:>16}".format("objects", "all(Amenity) us"))
+    for size in sizes:
+        FileStorage._FileStorage__objects = {}
+        populate(storage, size)
+        runs = 1000
+        total = timeit.timeit(lambda: storage.all(Amenity), number=runs)
+        print("{:>10} {:>16.2f}".format(storage.count(),
+                                        total / runs * 1000000))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
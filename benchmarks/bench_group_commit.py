@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage write throughput under concurrent saves, writing on
+every save against grouping them with a commit interval
+
+usage: python3 -m benchmarks.bench_group_commit [size [threads [saves]]]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+
+def run(storage, threads, saves):
+    """returns the saves per second of threads each saving saves Reviews"""
+    def work():
+        """creates and saves Reviews, waiting until each is written"""
+        for i in range(saves):
+            review = Review(place_id="place", user_id="user", text=str(i))
+            storage.new(review)
+            storage.save().result()
+    workers = [threading.Thread(target=work) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * saves / (time.perf_counter() - start)
+
+
+def main(size=10000, threads=50, saves=4):
+    """prints the write throughput with and without grouped saves"""
+    storage = FileStorage()
+    FileStorage._FileStorage__file_path = os.path.join(tempfile.mkdtemp(),
+                                                       "file.json")
+    FileStorage._FileStorage__objects = {}
+    for i in range(size):
+        storage.new(Review(place_id="place", text=str(i)))
+    print("{} objects, {} threads x {} saves".format(size, threads, saves))
+    for interval in (0, 0.05):
+        FileStorage._FileStorage__commit_interval = interval
+        print("interval {:>5}s: {:>10.1f} saves/s".format(
+            interval, run(storage, threads, saves)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""
+Benchmarks the pages of the users in (created_at, id) order with FileStorage:
+time to fetch a page near the start and near the end of the list, by offset
+and by cursor (keyset)
+
+usage: python3 -m benchmarks.bench_pagination [size]
+"""
+
+import sys
+import time
+from models.engine.file_storage import FileStorage
+from models.user import User
+
+
+def timed(function, runs=20):
+    """returns the average time in ms of a call to function"""
+    start = time.perf_counter()
+    for i in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main(size=100000, limit=100):
+    """prints the time to fetch the first and the last pages"""
+    storage = FileStorage()
+    FileStorage._FileStorage__objects = {}
+    for i in range(size):
+        storage.new(User(email="user_{}@hbnb.io".format(i)))
+    query = storage.query(User).order_by("created_at", "id")
+    users = query.all()
+    print("{} users, pages of {}".format(size, limit))
+    print("{:>10} {:>12} {:>12}".format("page", "offset ms", "cursor ms"))
+    for page in (1, size // limit - 1):
+        last = users[page * limit - 1]
+        offset = timed(lambda: query.offset(page * limit).limit(limit).all())
+        cursor = timed(lambda: query.after(last.created_at, last.id)
+                       .limit(limit).all())
+        print("{:>10} {:>12.3f} {:>12.3f}".format(page, offset, cursor))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
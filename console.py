@@ -69,6 +69,30 @@ class HBNBCommand(cmd.Cmd):
         print(instance.id)
         instance.save()
 
+    def do_create_many(self, arg):
+        """Creates count new instances of a class, saved together"""
+        args = arg.split()
+        if len(args) == 0:
+            print("** class name missing **")
+            return False
+        if args[0] not in classes:
+            print("** class doesn't exist **")
+            return False
+        if len(args) == 1:
+            print("** count missing **")
+            return False
+        try:
+            count = int(args[1])
+        except ValueError:
+            print("** count must be a number **")
+            return False
+        new_dict = self._key_value_parser(args[2:])
+        instances = [classes[args[0]](**new_dict) for i in range(count)]
+        models.storage.new_many(instances)
+        models.storage.save()
+        for instance in instances:
+            print(instance.id)
+
     def do_show(self, arg):
         """Prints an instance as a string based on the class and id"""
         args = shlex.split(arg)
@@ -77,9 +101,9 @@ class HBNBCommand(cmd.Cmd):
             return False
         if args[0] in classes:
             if len(args) > 1:
-                key = args[0] + "." + args[1]
-                if key in models.storage.all():
-                    print(models.storage.all()[key])
+                obj = models.storage.get(args[0], args[1])
+                if obj is not None:
+                    print(obj)
                 else:
                     print("** no instance found **")
             else:
@@ -88,15 +112,15 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
 
     def do_destroy(self, arg):
-        """Deletes an instance based on the class and id"""
+        """Deletes instances based on the class and one or more ids"""
         args = shlex.split(arg)
         if len(args) == 0:
             print("** class name missing **")
         elif args[0] in classes:
             if len(args) > 1:
-                key = args[0] + "." + args[1]
-                if key in models.storage.all():
-                    models.storage.all().pop(key)
+                objs = [models.storage.get(args[0], id) for id in args[1:]]
+                if None not in objs:
+                    models.storage.delete_many(objs)
                     models.storage.save()
                 else:
                     print("** no instance found **")
@@ -108,18 +132,18 @@ class HBNBCommand(cmd.Cmd):
     def do_all(self, arg):
         """Prints string representations of instances"""
         args = shlex.split(arg)
-        obj_list = []
         if len(args) == 0:
-            obj_dict = models.storage.all()
+            objects = models.storage.iter()
         elif args[0] in classes:
-            obj_dict = models.storage.all(classes[args[0]])
+            objects = models.storage.iter(classes[args[0]])
         else:
             print("** class doesn't exist **")
             return False
-        for key in obj_dict:
-            obj_list.append(str(obj_dict[key]))
+        separator = ""
         print("[", end="")
-        print(", ".join(obj_list), end="")
+        for obj in objects:
+            print(separator + str(obj), end="")
+            separator = ", "
         print("]")
 
     def do_update(self, arg):
@@ -132,8 +156,8 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
         elif args[0] in classes:
             if len(args) > 1:
-                k = args[0] + "." + args[1]
-                if k in models.storage.all():
+                obj = models.storage.get(args[0], args[1])
+                if obj is not None:
                     if len(args) > 2:
                         if len(args) > 3:
                             if args[0] == "Place":
@@ -147,8 +171,8 @@ class HBNBCommand(cmd.Cmd):
                                         args[3] = float(args[3])
                                     except:
                                         args[3] = 0.0
-                            setattr(models.storage.all()[k], args[2], args[3])
-                            models.storage.all()[k].save()
+                            setattr(obj, args[2], args[3])
+                            obj.save()
                         else:
                             print("** value missing **")
                     else:
@@ -6,11 +6,21 @@ initialize the models package
 from os import getenv
 
 
-storage_t = getenv("HBNB_TYPE_STORAGE")
+# the storage engine: "db" (MySQL), "sqlite", "memory" or the JSON file by
+# default
+engine_t = getenv("HBNB_TYPE_STORAGE")
+# "db" when the models are mapped to the tables of a SQL database
+storage_t = "db" if engine_t in ("db", "sqlite") else engine_t
 
-if storage_t == "db":
+if engine_t == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+elif storage_t == "db":
     from models.engine.db_storage import DBStorage
     storage = DBStorage()
+elif engine_t == "memory":
+    from models.engine.memory_storage import MemoryStorage
+    storage = MemoryStorage()
 else:
     from models.engine.file_storage import FileStorage
     storage = FileStorage()
@@ -23,7 +23,7 @@ class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.utcnow)
+        created_at = Column(DateTime, default=datetime.utcnow, index=True)
         updated_at = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, *args, **kwargs):
@@ -47,6 +47,13 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute and lets the storage update its indexes"""
+            old = getattr(self, name, None)
+            super().__setattr__(name, value)
+            models.storage.changed(self, name, old)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -4,7 +4,7 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 
@@ -12,6 +12,8 @@ class City(BaseModel, Base):
     """Representation of city """
     if models.storage_t == "db":
         __tablename__ = 'cities'
+        __table_args__ = (Index('ix_cities_state_id_created_at', 'state_id',
+                                'created_at'),)
         state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
         name = Column(String(128), nullable=False)
         places = relationship("Place", backref="cities")
@@ -22,3 +24,10 @@ class City(BaseModel, Base):
     def __init__(self, *args, **kwargs):
         """initializes city"""
         super().__init__(*args, **kwargs)
+
+    if models.storage_t != "db":
+        @property
+        def places(self):
+            """getter for list of place instances located in the city"""
+            from models.place import Place
+            return models.storage.find(Place, city_id=self.id)
@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+"""
+Converts a FileStorage file from one format to another
+
+usage: python3 -m models.engine.convert <source> <destination>
+the formats are picked by the extensions of the paths (.json, .jsonl, .bin)
+"""
+
+from models.engine.formats import format_for
+import sys
+
+
+def convert(source, destination, source_format=None,
+            destination_format=None):
+    """
+    Rewrites the storage file source as destination, one object at a time
+
+    Args:
+        source: path of the storage file to read
+        destination: path of the storage file to write
+        source_format: name of the format of source, or None for its
+                       extension
+        destination_format: name of the format of destination, or None
+                            for its extension
+
+    Return: the number of objects converted
+    """
+    reader = format_for(source, source_format)
+    writer = format_for(destination, destination_format)
+    count = [0]
+
+    def fragments(entries):
+        """encodes the entries read from source for destination"""
+        for key, record, fragment in entries:
+            count[0] += 1
+            yield writer.dump(key, record)
+
+    with open(source, "rb" if reader.binary else "r") as src:
+        with open(destination, "wb" if writer.binary else "w") as dst:
+            writer.write(dst, fragments(reader.read(src)))
+    return count[0]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python3 -m models.engine.convert <source> "
+              "<destination>", file=sys.stderr)
+        sys.exit(1)
+    print("{} objects converted".format(convert(*sys.argv[1:])))
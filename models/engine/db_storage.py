@@ -7,63 +7,203 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.query import Query, operators
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import Index, and_, create_engine, func, literal, or_
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import defaultload, joinedload, scoped_session
+from sqlalchemy.orm import selectinload, sessionmaker
+import time
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# loader option of each strategy of Query.load
+loaders = {"selectin": selectinload, "joined": joinedload}
+
+
+class DBQuery(Query):
+    """a query compiled to a single SQL statement"""
+
+    def __init__(self, session, cls):
+        """
+        Instantiates a query matching every object of cls
+
+        Args:
+            session: the database session running the query
+            cls: the class of the objects to return
+        """
+        super().__init__(cls)
+        # the database session running the query
+        self.session = session
+
+    def statement(self):
+        """returns the SQLAlchemy query with the WHERE, ORDER BY, LIMIT
+        and OFFSET clauses of the query"""
+        query = self.session.query(self.cls)
+        for attr, op, value in self.filters:
+            column = getattr(self.cls, attr)
+            if op == "in":
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(operators[op](column, value))
+        if self.cursor is not None:
+            query = query.filter(self.seek())
+        for attr, descending in self.ordering:
+            column = getattr(self.cls, attr)
+            query = query.order_by(column.desc() if descending else column)
+        if self.start:
+            query = query.offset(self.start)
+        if self.size is not None:
+            query = query.limit(self.size)
+        loaded = set()
+        for path, strategy in self.loads:
+            query = query.options(self.loader(path, strategy, loaded))
+        return query
+
+    def loader(self, path, strategy, loaded):
+        """
+        Returns the loader option loading the relationships of path with
+        strategy, leaving the strategy of a relationship given by an
+        earlier path
+
+        Args:
+            path: the dotted relationship names
+            strategy: "selectin" or "joined"
+            loaded: the paths of the relationships given a strategy, to
+                    which those of path are added
+        """
+        loader = None
+        cls = self.cls
+        prefix = ""
+        for name in path.split("."):
+            attr = getattr(cls, name)
+            prefix += "." + name
+            load = defaultload if prefix in loaded else loaders[strategy]
+            loaded.add(prefix)
+            if loader is None:
+                loader = load(attr)
+            else:
+                loader = getattr(loader, load.__name__)(attr)
+            cls = attr.property.mapper.class_
+        return loader
+
+    def seek(self):
+        """returns the condition matching the rows after the cursor in the
+        ordering, bounding the first column so an index can seek to it"""
+        condition = None
+        for (attr, descending), value in reversed(list(zip(self.ordering,
+                                                           self.cursor))):
+            column = getattr(self.cls, attr)
+            after = column < value if descending else column > value
+            if condition is not None:
+                after = or_(after, and_(column == value, condition))
+            condition = after
+        attr, descending = self.ordering[0]
+        column = getattr(self.cls, attr)
+        bound = self.cursor[0]
+        return and_(column <= bound if descending else column >= bound,
+                    condition)
+
+    def all(self):
+        """returns the list of the objects matching the query"""
+        return self.statement().all()
+
+    def __iter__(self):
+        """iterates over the objects matching the query, fetching 1000
+        rows at a time unless related objects are joined to them"""
+        if any(strategy == "joined" for path, strategy in self.loads):
+            return iter(self.all())
+        return iter(self.statement().yield_per(1000))
+
+    def count(self):
+        """returns the number of objects all() would return"""
+        return self.statement().count()
+
 
 class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    # float - seconds the counts are cached for, 0 to query them every time
+    __count_ttl = float(getenv('HBNB_COUNT_TTL', 0))
+    # tuple - (time, {class name: count}) of the counts last queried
+    __counts = None
 
     def __init__(self):
         """Instantiate a DBStorage object"""
+        HBNB_ENV = getenv('HBNB_ENV')
+        self.__engine = self.connect()
+        if HBNB_ENV == "test":
+            Base.metadata.drop_all(self.__engine)
+
+    def connect(self):
+        """returns the engine of the MySQL database"""
         HBNB_MYSQL_USER = getenv('HBNB_MYSQL_USER')
         HBNB_MYSQL_PWD = getenv('HBNB_MYSQL_PWD')
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
-        HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
-        if HBNB_ENV == "test":
-            Base.metadata.drop_all(self.__engine)
+        return create_engine('mysql+mysqldb://{}:{}@{}/{}'.
+                             format(HBNB_MYSQL_USER,
+                                    HBNB_MYSQL_PWD,
+                                    HBNB_MYSQL_HOST,
+                                    HBNB_MYSQL_DB))
 
     def all(self, cls=None):
-        """query on the current database session"""
-        new_dict = {}
+        """
+        Returns the dictionary of the objects, or of the objects of cls, by
+        <class name>.id, streamed from each table 1000 rows at a time
+        instead of fetching every row of a table before building them
+        """
+        return {obj.__class__.__name__ + '.' + obj.id: obj
+                for obj in self.iter(cls)}
+
+    def iter(self, cls=None, batch_size=1000):
+        """
+        Yields the objects, or the objects of cls, fetching batch_size rows
+        at a time from a server-side cursor instead of loading every row
+        """
         for clss in classes:
-            if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
-        return (new_dict)
+            if cls is None or cls is classes[clss] or cls == clss:
+                query = select(classes[clss]).execution_options(
+                    yield_per=batch_size)
+                yield from self.__session.scalars(query)
 
     def new(self, obj):
         """add the object to the current database session"""
+        self.__counts = None
         self.__session.add(obj)
 
+    def new_many(self, objs):
+        """add every object of objs to the current database session, sent
+        by the next commit as batched multi-row INSERTs"""
+        self.__counts = None
+        self.__session.add_all([obj for obj in objs if obj is not None])
+
     def save(self):
         """commit all changes of the current database session"""
+        self.__counts = None
         self.__session.commit()
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
         if obj is not None:
+            self.__counts = None
             self.__session.delete(obj)
 
+    def delete_many(self, objs):
+        """delete from the current database session every object of objs,
+        sent by the next commit as one executemany DELETE per table"""
+        self.__counts = None
+        for obj in objs:
+            if obj is not None:
+                self.__session.delete(obj)
+
     def reload(self):
         """reloads data from the database"""
         Base.metadata.create_all(self.__engine)
@@ -83,12 +223,77 @@ class DBStorage:
             cls: the class of the object to return
             id: string representing the object ID
         """
-        if cls is None or cls in classes.keys() or cls in classes.values():
-            objects = self.all(cls)
-            for object in objects:
-                object_id = object.split(".")[1]
-                if object_id == id:
-                    return objects[object]
+        if cls is None:
+            candidates = classes.values()
+        elif cls in classes.keys():
+            candidates = [classes[cls]]
+        elif cls in classes.values():
+            candidates = [cls]
+        else:
+            return None
+        for clss in candidates:
+            obj = self.__session.get(clss, id)
+            if obj is not None:
+                return obj
+
+    def create_index(self, cls, attr):
+        """
+        Declares a database index on the column attr of the table of cls,
+        and creates it if the database does not have it yet
+
+        Args:
+            cls: the class (or class name) of the objects to index
+            attr: the name of the column to index
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        table = cls.__table__
+        column = table.columns[attr]
+        for index in table.indexes:
+            if list(index.columns) == [column]:
+                return
+        index = Index("ix_{}_{}".format(table.name, attr), column)
+        index.create(self.__engine, checkfirst=True)
+
+    def query(self, cls):
+        """returns a query on the objects of cls (or class name)"""
+        if isinstance(cls, str):
+            cls = classes[cls]
+        return DBQuery(self.__session, cls)
+
+    def find(self, cls, **kwargs):
+        """
+        Returns the list of objects of cls whose attributes match kwargs,
+        filtered by the database
+
+        Args:
+            cls: the class (or class name) of the objects to return
+            kwargs: attribute names and the values they must equal
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        return self.__session.query(cls).filter_by(**kwargs).all()
+
+    def find_range(self, cls, attr, low=None, high=None):
+        """
+        Returns the list of objects of cls whose attr is between low and
+        high, sorted by attr, filtered by the database
+
+        Args:
+            cls: the class (or class name) of the objects to return
+            attr: the name of the numeric column
+            low: the smallest value of attr matched, None for no bound
+            high: the largest value of attr matched, None for no bound
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        column = getattr(cls, attr)
+        query = self.__session.query(cls)
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+        return query.order_by(column).all()
 
     def count(self, cls=None):
         """
@@ -98,7 +303,35 @@ class DBStorage:
         Args:
             cls: class (optional) the class to count in the storage
         """
-        if cls is None or cls in classes.keys() or cls in classes.values():
-            objects = self.all(cls)
-            return len(objects)
-        return 0
+        if cls is None:
+            return sum(self.counts().values())
+        if cls in classes.values():
+            cls = cls.__name__
+        if cls not in classes.keys():
+            return 0
+        counts = self.__cached()
+        if counts is not None:
+            return counts[cls]
+        query = select(func.count()).select_from(classes[cls])
+        return self.__session.execute(query).scalar()
+
+    def __cached(self):
+        """returns the cached counts if they are fresh, else None"""
+        if (self.__counts is not None and
+                time.monotonic() - self.__counts[0] < self.__count_ttl):
+            return self.__counts[1]
+        return None
+
+    def counts(self):
+        """
+        Returns the number of objects of each class, by class name,
+        counted by a single query, and cached for HBNB_COUNT_TTL seconds
+        """
+        counts = self.__cached()
+        if counts is None:
+            query = union_all(*(
+                select(literal(name), func.count()).select_from(clss)
+                for name, clss in classes.items()))
+            counts = dict(self.__session.execute(query).all())
+            self.__counts = (time.monotonic(), counts)
+        return dict(counts)
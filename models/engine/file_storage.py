@@ -3,9 +3,27 @@
 Contains the FileStorage class
 """
 
+import atexit
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import fcntl
+from itertools import islice, repeat
 import json
+import multiprocessing
+from operator import itemgetter
+import os
+from os import getenv
+import sys
+import threading
+from types import MappingProxyType
+from models.engine.formats import format_for
+from models.engine.query import Query
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, time
 from models.city import City
 from models.place import Place
 from models.review import Review
@@ -15,59 +33,1250 @@ from models.user import User
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# attributes indexed for each class, the foreign keys and those declared
+# by create_index: <class name> -> attribute names
+indexes = {"City": ("state_id",), "Place": ("city_id", "user_id"),
+           "Review": ("place_id", "user_id"), "User": ("email",)}
+
+# attributes kept sorted for range queries and ordering for each class,
+# the creation date for pagination and the numbers of places:
+# <class name> -> attribute names
+ranges = {name: ("created_at",) for name in classes}
+ranges["Place"] += ("max_guest", "number_bathrooms", "number_rooms",
+                    "price_by_night")
+
+
+def read_entries(path, fmt, build):
+    """
+    Reads the storage file at path one entry at a time
+
+    Args:
+        path: path of the storage file
+        fmt: the format instance reading it
+        build: whether to build the objects or keep their dictionaries
+
+    Return: an iterator of (key, object or dictionary, fragment) tuples
+    """
+    try:
+        with open(path, 'rb' if fmt.binary else 'r') as f:
+            for key, record, fragment in fmt.read(f):
+                if build:
+                    record = classes[record["__class__"]](**record)
+                yield key, record, fragment
+    except FileNotFoundError:
+        pass
+
+
+def read_file(path, fmt, build):
+    """reads the whole storage file at path, in a worker process or thread,
+    and returns fmt with the list of the entries read"""
+    return fmt, list(read_entries(path, fmt, build))
+
+
+def is_sortable(value):
+    """returns whether value can be kept in a sorted index, a number or a
+    date"""
+    return isinstance(value, (int, float, datetime)) and value == value
+
+
+class FileQuery(Query):
+    """a query run against the indexes of a FileStorage"""
+
+    def __init__(self, storage, cls):
+        """
+        Instantiates a query matching every object of cls
+
+        Args:
+            storage: the FileStorage running the query
+            cls: the class of the objects to return
+        """
+        super().__init__(cls)
+        # the FileStorage running the query
+        self.storage = storage
+
+    def indexed(self):
+        """returns the objects read from the hash index of an eq or in
+        filter, or None when no such filter has one"""
+        name = self.cls.__name__
+        for attr, op, value in self.filters:
+            if attr in indexes.get(name, ()):
+                if op == "eq":
+                    return self.storage.find(name, **{attr: value})
+                if op == "in":
+                    return [obj for value in dict.fromkeys(value)
+                            for obj in self.storage.find(name,
+                                                         **{attr: value})]
+        return None
+
+    def bounds(self, attr):
+        """returns the (low, high) bounds the filters of the query put on
+        attr, None for no bound"""
+        low = high = None
+        for other, op, value in self.filters:
+            if other != attr or not is_sortable(value):
+                continue
+            if op in ("gt", "ge"):
+                low = value if low is None else max(low, value)
+            elif op in ("lt", "le"):
+                high = value if high is None else min(high, value)
+        return low, high
+
+    def ordered(self):
+        """returns an iterator over the objects in the ordering of the
+        query, starting after its cursor, read from a sorted index; None
+        when the ordering has none"""
+        name = self.cls.__name__
+        if not self.ordering:
+            return None
+        attr, descending = self.ordering[0]
+        if descending or attr not in ranges.get(name, ()) or \
+                self.ordering[1:] not in ((), (("id", False),)):
+            return None
+        after = self.cursor
+        if after is not None and len(after) == 2:
+            after = (after[0], "{}.{}".format(name, after[1]))
+        return self.storage.iter_range(name, attr, *self.bounds(attr),
+                                       after=after)
+
+    def candidates(self):
+        """returns the objects that may match the query, read from the
+        index of one of its attributes when there is one"""
+        name = self.cls.__name__
+        for attr, op, value in self.filters:
+            if attr in ranges.get(name, ()) and op in ("lt", "le", "gt",
+                                                       "ge"):
+                return self.storage.iter_range(name, attr,
+                                               *self.bounds(attr))
+        return self.storage.iter(name)
+
+    def __iter__(self):
+        """iterates over the objects matching the query, only reading
+        the objects returned when a sorted index gives its ordering"""
+        objects = self.indexed()
+        if objects is None:
+            objects = self.ordered()
+            if objects is not None:
+                stop = None if self.size is None else self.start + self.size
+                return islice((obj for obj in objects if self.matches(obj)),
+                              self.start, stop)
+            objects = self.candidates()
+        return self.arrange(obj for obj in objects if self.matches(obj))
+
+    def all(self):
+        """returns the list of the objects matching the query"""
+        return list(self)
+
 
 class FileStorage:
     """serializes instances to a JSON file & deserializes back to instances"""
 
     # string - path to the JSON file
     __file_path = "file.json"
+    # string - format of the file (json, jsonl or binary), None to pick it
+    # by the extension of __file_path
+    __file_format = getenv("HBNB_FILE_FORMAT")
+    # string - directory holding one file per class (<class name> and the
+    # extension of the format), None to keep every object in __file_path
+    __shards_path = getenv("HBNB_FILE_SHARDS")
+    # set - names of the classes that lost objects since the last snapshot
+    __removed = set()
+    # integer - number of workers reading the shards on reload
+    __reload_workers = int(getenv("HBNB_FILE_RELOAD_WORKERS",
+                                  os.cpu_count() or 1))
+    # string - "thread" or "process" pool of the reload workers, threads
+    # while the models package is being imported
+    __reload_pool = getenv("HBNB_FILE_RELOAD_POOL", "thread")
+    # integer - combined size in bytes of the shards from which they are
+    # read in parallel, below it the workers cost more than they save
+    __parallel_min = 4 * 1024 * 1024
+    # boolean - whether several processes share the storage files, writing
+    # them under an advisory lock on <file or shards path>.lock, whose
+    # 8 byte header counts the saves (the generation)
+    __multiprocess = getenv("HBNB_FILE_MULTIPROCESS", "0") not in ("", "0")
+    # integer - generation of the storage files last read or written
+    __generation = 0
+    # thread holding the exclusive lock on the lock file
+    __lock_holder = None
+    # tuple - (pid, descriptor) of the lock file kept open to read the
+    # generation
+    __watch = None
+    # dictionary - path -> (mtime, size, inode) of each storage file when
+    # this process last read or wrote it
+    __seen = {}
+    # integer - number of bytes of the journal applied to __objects
+    __journal_offset = 0
+    # string - path to the journal of changes saved since the last snapshot
+    __journal_path = getenv("HBNB_FILE_JOURNAL")
+    # integer - size in bytes past which the journal is folded into a snapshot
+    __journal_max = int(getenv("HBNB_FILE_JOURNAL_MAX", 8 * 1024 * 1024))
+    # dictionary - objects changed since the last save, None when deleted
+    __pending = {}
+    # float - seconds a background writer groups saves for, 0 to write
+    # on every save
+    __commit_interval = float(getenv("HBNB_FILE_COMMIT_INTERVAL", 0))
+    # integer - number of waiting saves that triggers a write right away
+    __commit_batch = int(getenv("HBNB_FILE_COMMIT_BATCH", 100))
+    # list - Futures of the saves not written yet
+    __waiting = []
+    # the background writer thread, started by the first grouped save
+    __writer = None
+    # exception of the last grouped write that failed, raised by the next
+    # save() or flush()
+    __error = None
+    # lock guarding the objects and indexes, and signalling the writer
+    __lock = threading.RLock()
+    __commit = threading.Condition(__lock)
+    # lock serializing the writes to the JSON file and journal
+    __write_lock = threading.RLock()
+    # integer - number of objects kept materialized in lazy mode, where
+    # reload() only keeps the fragments; None to load eagerly
+    __cache_size = getenv("HBNB_FILE_LAZY_CACHE")
+    if __cache_size is not None:
+        __cache_size = int(__cache_size)
     # dictionary - empty but will store all objects by <class name>.id
     __objects = {}
+    # dictionary - fragments (file text) of the objects not materialized
+    __raw = {}
+    # ordered dictionary - keys materialized from __raw, least recent first
+    __recent = OrderedDict()
+    # dictionary - <class name> -> {key: None} for the keys of that class
+    __classes = {}
+    # dictionary - <class name>.<attribute> -> {value: {key: None}}
+    __indexes = {}
+    # dictionary - <class name>.<attribute> -> sorted list of the (value,
+    # key) of the objects whose attribute is a number, built by the first
+    # range query on it
+    __sorted = {}
+    # dictionary - cached fragment (file encoding) of each object
+    __fragments = {}
+    # the format instance the cached fragments are encoded with
+    __fragments_format = None
+    # tuple - the (path, format name) the format instance was picked for
+    __format_for = None
+    # set - keys of the objects changed since their text was cached
+    __dirty = set()
+    # the __objects dictionary that the indexes were built from
+    __indexed = None
+    # dictionary - <class name> (None for every class) -> read-only
+    # snapshot of its objects returned by all(), dropped when they change
+    __views = {}
+
+    def __sync(self):
+        """rebuilds the indexes if __objects was rebound since last built"""
+        if self.__indexed is self.__objects:
+            return
+        with self.__lock:
+            if self.__indexed is self.__objects:
+                return
+            FileStorage.__views = {}
+            self.__removed.update(self.__classes)
+            FileStorage.__classes = {}
+            FileStorage.__indexes = {}
+            FileStorage.__sorted = {}
+            FileStorage.__fragments = {}
+            FileStorage.__dirty = set(self.__objects) | set(self.__raw)
+            FileStorage.__indexed = self.__objects
+            for key in self.__dirty:
+                self.__index(key)
+
+    def __invalidate(self, key):
+        """drops the snapshots returned by all() that hold key"""
+        self.__views.pop(key.partition(".")[0], None)
+        self.__views.pop(None, None)
+
+    def __format(self):
+        """returns the format of the storage file, converting the cached
+        fragments when the file path or format changed it"""
+        fmt = self.__fragments_format
+        if self.__format_for == (self.__file_path, self.__file_format):
+            return fmt
+        with self.__lock:
+            FileStorage.__format_for = (self.__file_path, self.__file_format)
+            new = format_for(*self.__format_for)
+            if type(new) is type(fmt):
+                return fmt
+            if fmt is not None:
+                for key, raw in self.__raw.items():
+                    self.__raw[key] = new.dump(key, fmt.load(key, raw))
+                self.__dirty.update(self.__fragments)
+                self.__fragments.clear()
+            FileStorage.__fragments_format = new
+        return new
+
+    def __record(self, key):
+        """returns the dictionary of the object not materialized under key"""
+        return self.__format().load(key, self.__raw[key])
+
+    def __value(self, key, attr, record=None):
+        """returns attr of the object stored under key, read from record
+        or its fragment when it is not materialized"""
+        obj = self.__objects.get(key)
+        if obj is not None:
+            return getattr(obj, attr, None)
+        if record is None:
+            record = self.__record(key)
+        default = getattr(classes[record["__class__"]], attr, None)
+        value = record.get(attr, default)
+        if attr in ("created_at", "updated_at") and isinstance(value, str):
+            value = datetime.strptime(value, time)
+        return value
+
+    def __index(self, key, record=None):
+        """adds key to its class bucket and its attribute indexes"""
+        name = key.partition(".")[0]
+        self.__classes.setdefault(name, {})[key] = None
+        for attr in indexes.get(name, ()):
+            index = self.__indexes.setdefault(name + "." + attr, {})
+            value = self.__value(key, attr, record)
+            index.setdefault(value, {})[key] = None
+        for attr in ranges.get(name, ()):
+            if name + "." + attr in self.__sorted:
+                self.__sort(key, attr, self.__value(key, attr, record))
+
+    def __unindex(self, key, attr=None, value=None):
+        """removes key from its indexes, or from the attr index for value"""
+        name = key.partition(".")[0]
+        if attr is None:
+            self.__classes.get(name, {}).pop(key, None)
+            for attr in indexes.get(name, ()):
+                self.__unindex(key, attr, self.__value(key, attr))
+            for attr in ranges.get(name, ()):
+                if name + "." + attr in self.__sorted:
+                    self.__unsort(key, attr, self.__value(key, attr))
+            return
+        index = self.__indexes.get(name + "." + attr, {})
+        matches = index.get(value)
+        if matches is not None:
+            matches.pop(key, None)
+            if not matches:
+                del index[value]
+
+    def __sort(self, key, attr, value):
+        """inserts key in the sorted index of attr, if built, for value"""
+        entries = self.__sorted.get(key.partition(".")[0] + "." + attr)
+        if entries is not None and is_sortable(value):
+            insort(entries, (value, key))
+
+    def __unsort(self, key, attr, value):
+        """removes key from the sorted index of attr, if built, for value"""
+        entries = self.__sorted.get(key.partition(".")[0] + "." + attr)
+        if entries is not None and is_sortable(value):
+            i = bisect_left(entries, (value, key))
+            if i < len(entries) and entries[i] == (value, key):
+                del entries[i]
+
+    def __add(self, key, obj=None, raw=None, record=None):
+        """stores obj under key in __objects, or the fragment raw in __raw
+        if obj is None, and adds key to the indexes (reading the values of
+        a fragment from its dictionary record when given)"""
+        self.__sync()
+        if key in self.__objects or key in self.__raw:
+            self.__unindex(key)
+        self.__invalidate(key)
+        self.__recent.pop(key, None)
+        if obj is not None:
+            self.__objects[key] = obj
+            self.__raw.pop(key, None)
+        else:
+            self.__objects.pop(key, None)
+            self.__raw[key] = raw
+        self.__index(key, record)
+        self.__dirty.add(key)
+
+    def __remove(self, key):
+        """removes the object stored under key from the storage"""
+        self.__sync()
+        self.__unindex(key)
+        self.__invalidate(key)
+        self.__removed.add(key.partition(".")[0])
+        self.__objects.pop(key, None)
+        self.__raw.pop(key, None)
+        self.__recent.pop(key, None)
+        self.__fragments.pop(key, None)
+        self.__dirty.discard(key)
+
+    def __object(self, key):
+        """returns the object stored under key, materializing it from its
+        fragment if needed, or None"""
+        obj = self.__objects.get(key)
+        if obj is None:
+            if key in self.__raw:
+                return self.__load(key)
+        elif self.__cache_size is not None and key in self.__recent:
+            with self.__lock:
+                if key in self.__recent:
+                    self.__recent.move_to_end(key)
+        return obj
+
+    def __load(self, key):
+        """materializes the object stored under key from its fragment,
+        evicting the least recently used unchanged objects past the cache
+        size"""
+        with self.__lock:
+            obj = self.__objects.get(key)
+            if obj is not None or key not in self.__raw:
+                return obj
+            record = self.__record(key)
+            obj = classes[record["__class__"]](**record)
+            self.__objects[key] = obj
+            self.__recent[key] = None
+            while self.__cache_size is not None and \
+                    len(self.__recent) > self.__cache_size:
+                old = self.__recent.popitem(last=False)[0]
+                if old in self.__raw:
+                    del self.__objects[old]
+        return obj
+
+    def __build(self, key, record, fragment=None):
+        """
+        Stores the object of the dictionary record under key, materialized
+        unless the storage is lazy
+
+        Args:
+            key: <class name>.id of the object
+            record: the dictionary of the object, or the object built from
+                    it when the storage is not lazy
+            fragment: the encoding record was read from, if any, cached as
+                      the fragment of the object
+        """
+        if fragment is None and self.__cache_size is not None:
+            fragment = self.__format().dump(key, record)
+        if self.__cache_size is not None:
+            self.__add(key, raw=fragment, record=record)
+        elif isinstance(record, BaseModel):
+            self.__add(key, record)
+        else:
+            self.__add(key, classes[record["__class__"]](**record))
+        if fragment is not None:
+            self.__fragments[key] = fragment
+            self.__dirty.discard(key)
 
     def all(self, cls=None):
-        """returns the dictionary __objects"""
-        if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+        """
+        Returns a read-only snapshot of the objects, or of the objects of
+        cls, by <class name>.id
+
+        The snapshot is not changed by later writes, which publish a new
+        one on the next call instead, so it can be iterated while other
+        threads write. In lazy mode a new dictionary is returned instead.
+        """
+        self.refresh()
+        self.__sync()
+        if cls is not None and not isinstance(cls, str):
+            cls = cls.__name__
+        if self.__raw or self.__cache_size is not None:
+            if cls is None:
+                keys = list(self.__raw) + list(self.__objects)
+            else:
+                keys = list(self.__classes.get(cls, {}))
+            return {key: self.__object(key) for key in keys}
+        view = self.__views.get(cls)
+        if view is None:
+            with self.__lock:
+                self.__sync()
+                view = self.__views.get(cls)
+                if view is None:
+                    if cls is None:
+                        objects = dict(self.__objects)
+                    else:
+                        objects = {key: self.__objects[key]
+                                   for key in self.__classes.get(cls, {})}
+                    view = MappingProxyType(objects)
+                    self.__views[cls] = view
+        return view
+
+    def iter(self, cls=None, batch_size=None):
+        """
+        Yields the objects, or the objects of cls, one at a time without
+        building a dictionary of them
+
+        Only the list of their keys is copied, under the lock, and each
+        object is looked up when yielded, skipped if deleted meanwhile. In
+        lazy mode each object is only materialized when yielded, so the
+        cache keeps the memory bounded. batch_size is ignored, the objects
+        already being in memory.
+        """
+        self.refresh()
+        self.__sync()
+        if cls is not None and not isinstance(cls, str):
+            cls = cls.__name__
+        with self.__lock:
+            if cls is None:
+                buckets = list(self.__classes.values())
+            else:
+                buckets = [self.__classes.get(cls, {})]
+            keys = [key for bucket in buckets for key in bucket]
+        for key in keys:
+            obj = self.__object(key)
+            if obj is not None:
+                yield obj
 
     def new(self, obj):
         """sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            with self.__lock:
+                self.__add(key, obj)
+                self.__pending[key] = obj
+
+    def new_many(self, objs):
+        """
+        Sets in __objects every object of objs, under one hold of the lock,
+        merging them into the built sorted indexes with one sort of each
+        instead of one insertion per object
+
+        Args:
+            objs: the objects to add, saved together by the next save()
+        """
+        objs = [obj for obj in objs if obj is not None]
+        keys = [obj.__class__.__name__ + "." + obj.id for obj in objs]
+        with self.__lock:
+            self.__sync()
+            detached = self.__detach(keys)
+            try:
+                for key, obj in zip(keys, objs):
+                    self.__add(key, obj)
+                    self.__pending[key] = obj
+            finally:
+                self.__attach(detached, keys)
+
+    def delete_many(self, objs):
+        """
+        Deletes every object of objs from __objects, under one hold of the
+        lock, filtering the built sorted indexes once
+
+        Args:
+            objs: the objects to delete, removed from the file by the next
+                  save()
+        """
+        keys = [obj.__class__.__name__ + "." + obj.id
+                for obj in objs if obj is not None]
+        with self.__lock:
+            self.__sync()
+            detached = self.__detach(keys)
+            try:
+                for key in keys:
+                    if key in self.__objects or key in self.__raw:
+                        self.__remove(key)
+                        self.__pending[key] = None
+            finally:
+                self.__attach(detached, keys)
+
+    def __detach(self, keys):
+        """removes from __sorted, and returns, the built sorted indexes of
+        the classes of keys that hold fewer than 8 entries per key, so that
+        adding or removing keys skips them: sorting one of them again costs
+        less than inserting or removing the keys one at a time"""
+        names = {}
+        for key in keys:
+            name = key.partition(".")[0]
+            names[name] = names.get(name, 0) + 1
+        return {index: self.__sorted.pop(index)
+                for index in list(self.__sorted)
+                if len(self.__sorted[index]) <
+                8 * names.get(index.partition(".")[0], 0)}
+
+    def __attach(self, detached, keys):
+        """puts back the sorted indexes detached, with the entries of keys
+        replaced by those of the objects now stored under them"""
+        keys = set(keys)
+        for index, entries in detached.items():
+            name, _, attr = index.partition(".")
+            entries[:] = [entry for entry in entries if entry[1] not in keys]
+            for key in keys:
+                if key.partition(".")[0] == name and \
+                        (key in self.__objects or key in self.__raw):
+                    value = self.__value(key, attr)
+                    if is_sortable(value):
+                        entries.append((value, key))
+            entries.sort()
+            self.__sorted[index] = entries
+
+    def changed(self, obj, attr, old):
+        """
+        Marks obj as changed so its next save serializes it again, and
+        moves it in the index of attr if it has one
+
+        Args:
+            obj: the object whose attribute was set
+            attr: the name of the attribute
+            old: the value attr had before it was set
+        """
+        name = obj.__class__.__name__
+        key = "{}.{}".format(name, getattr(obj, "id", None))
+        if self.__objects.get(key) is not obj:
+            return
+        with self.__lock:
+            self.__sync()
+            if self.__objects.get(key) is not obj:
+                return
+            self.__dirty.add(key)
+            self.__pending[key] = obj
+            self.__raw.pop(key, None)
+            self.__recent.pop(key, None)
+            if attr in indexes.get(name, ()):
+                self.__unindex(key, attr, old)
+                index = self.__indexes.setdefault(name + "." + attr, {})
+                index.setdefault(getattr(obj, attr, None), {})[key] = None
+            if attr in ranges.get(name, ()):
+                self.__unsort(key, attr, old)
+                self.__sort(key, attr, getattr(obj, attr, None))
+
+    def create_index(self, cls, attr):
+        """
+        Declares a hash index on attr of the objects of cls, from which
+        find() reads the objects whose attr equals a value
+
+        Args:
+            cls: the class (or class name) of the objects to index
+            attr: the name of the attribute to index
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        with self.__lock:
+            self.__sync()
+            if attr in indexes.get(cls, ()):
+                return
+            indexes[cls] = indexes.get(cls, ()) + (attr,)
+            index = self.__indexes.setdefault(cls + "." + attr, {})
+            for key in self.__classes.get(cls, {}):
+                index.setdefault(self.__value(key, attr), {})[key] = None
+
+    def query(self, cls):
+        """returns a query on the objects of cls (or class name)"""
+        if isinstance(cls, str):
+            cls = classes[cls]
+        return FileQuery(self, cls)
+
+    def find(self, cls, **kwargs):
+        """
+        Returns the list of objects of cls whose attributes match kwargs,
+        read from an index when one of the attributes has one
+
+        Args:
+            cls: the class (or class name) of the objects to return
+            kwargs: attribute names and the values they must equal
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.refresh()
+        self.__sync()
+        candidates = self.__classes.get(cls, {})
+        for attr, value in kwargs.items():
+            if attr in indexes.get(cls, ()):
+                index = self.__indexes.get(cls + "." + attr, {})
+                candidates = index.get(value, {})
+                break
+        objects = [self.__object(key) for key in list(candidates)]
+        return [obj for obj in objects
+                if obj is not None and
+                all(getattr(obj, attr, None) == value
+                    for attr, value in kwargs.items())]
+
+    def find_range(self, cls, attr, low=None, high=None):
+        """
+        Returns the list of objects of cls whose attr is between low and
+        high, sorted by attr, read from a sorted index when attr has one
+
+        Args:
+            cls: the class (or class name) of the objects to return
+            attr: the name of the numeric or date attribute
+            low: the smallest value of attr matched, None for no bound
+            high: the largest value of attr matched, None for no bound
+        """
+        return list(self.iter_range(cls, attr, low, high))
+
+    def iter_range(self, cls, attr, low=None, high=None, after=None):
+        """
+        Yields the objects of cls whose attr is between low and high in the
+        order of attr (then of their key), reading the sorted index of attr
+        a batch at a time, so that stopping early costs O(log N + k)
+
+        Args:
+            cls: the class (or class name) of the objects to return
+            attr: the name of the numeric or date attribute
+            low: the smallest value of attr matched, None for no bound
+            high: the largest value of attr matched, None for no bound
+            after: (value,) or (value, key) of attr and key to start after,
+                   None to start from low
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.refresh()
+        self.__sync()
+        first = itemgetter(0)
+        built = None
+        while True:
+            with self.__lock:
+                entries = built
+                if attr in ranges.get(cls, ()):
+                    entries = self.__sorted.get(cls + "." + attr)
+                if entries is None:
+                    values = ((self.__value(key, attr), key)
+                              for key in self.__classes.get(cls, {}))
+                    entries = sorted(entry for entry in values
+                                     if is_sortable(entry[0]))
+                    if attr in ranges.get(cls, ()):
+                        self.__sorted[cls + "." + attr] = entries
+                    else:
+                        built = entries
+                start = 0
+                if low is not None:
+                    start = bisect_left(entries, low, key=first)
+                if after is not None and len(after) == 1:
+                    start = max(start, bisect_right(entries, after[0],
+                                                    key=first))
+                elif after is not None:
+                    start = max(start, bisect_right(entries, tuple(after)))
+                end = len(entries)
+                if high is not None:
+                    end = bisect_right(entries, high, key=first)
+                batch = entries[start:min(end, start + 100)]
+            if not batch:
+                return
+            for value, key in batch:
+                obj = self.__object(key)
+                if obj is not None:
+                    yield obj
+            after = batch[-1]
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict(False)
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """serializes __objects to the JSON file (path: __file_path), or
+        appends the changes since the last save to the journal if enabled
 
-    def reload(self):
-        """deserializes the JSON file to __objects"""
+        When a commit interval is configured the write is left to a single
+        background writer, which groups every save() made within the
+        interval (or batch) into one write. When that write fails, the
+        next save() or flush() raises its exception; the changes it did
+        not write are kept for the next one.
+
+        Return: a Future resolved once this save has been written
+        """
+        future = Future()
+        with self.__lock:
+            self.__raise_error()
+            self.__waiting.append(future)
+            if self.__commit_interval > 0:
+                self.__start_writer()
+                self.__commit.notify()
+                return future
+        self.flush()
+        return future
+
+    def flush(self):
+        """writes the changes of every save() made so far and resolves the
+        Futures they returned, raising first the exception of a grouped
+        write that failed since the last save() or flush()"""
+        with self.__lock:
+            self.__raise_error()
+        self.__flush()
+
+    def __raise_error(self):
+        """raises once the exception of the last grouped write that failed,
+        if any; the caller holds __lock"""
+        error, FileStorage.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def __flush(self, grouped=False):
+        """writes the changes of every save() made so far and resolves the
+        Futures they returned, grouped by the background writer or not"""
+        with self.__write_lock:
+            with self.__file_lock(True):
+                waiting = self.__write_changes(grouped)
+        for future in waiting:
+            future.set_result(None)
+
+    def _discard_changes(self):
+        """forgets the changes tracked for the next write, for the storages
+        that keep them in memory only"""
+        with self.__lock:
+            FileStorage.__pending = {}
+            FileStorage.__dirty = set()
+            FileStorage.__removed = set()
+
+    def __write_changes(self, grouped=False):
+        """writes the changes of every save() made so far, while holding
+        the write locks, and returns the Futures of these saves
+
+        When the write raises, the Futures are failed and the exception is
+        raised again, or kept for the next save() or flush() when grouped
+        by the background writer.
+        """
+        with self.__lock:
+            self.__sync()
+            waiting, FileStorage.__waiting = self.__waiting, []
+            pending, FileStorage.__pending = self.__pending, {}
+            journal = self.__journal_path is not None
+            if not journal:
+                changes = self.__changes()
+        try:
+            if not journal:
+                self.__snapshot(*changes)
+            else:
+                self.__append(pending)
+        except Exception as error:
+            with self.__lock:
+                pending.update(self.__pending)
+                FileStorage.__pending = pending
+                if grouped:
+                    FileStorage.__error = error
+            for future in waiting:
+                future.set_exception(error)
+            if not grouped:
+                raise
+            return []
+        return waiting
+
+    def __start_writer(self):
+        """starts the background writer thread unless it is running"""
+        if FileStorage.__writer is None:
+            FileStorage.__writer = threading.Thread(target=self.__write_loop,
+                                                    daemon=True)
+            FileStorage.__writer.start()
+            atexit.register(self.flush)
+
+    def __write_loop(self):
+        """flushes at most once per commit interval, or as soon as a full
+        batch of saves is waiting"""
+        while True:
+            with self.__lock:
+                self.__commit.wait_for(lambda: self.__waiting)
+                self.__commit.wait_for(
+                    lambda: len(self.__waiting) >= self.__commit_batch,
+                    timeout=self.__commit_interval)
+            try:
+                self.__flush(True)
+            except Exception as error:
+                with self.__lock:
+                    FileStorage.__error = error
+
+    def __append(self, pending):
+        """appends the pending changes to the journal"""
+        self.__repair()
+        with open(self.__journal_path, 'a') as f:
+            for key, obj in pending.items():
+                if obj is None:
+                    entry = {"op": "delete", "key": key}
+                else:
+                    entry = {"op": "new", "key": key,
+                             "obj": obj.to_dict(False)}
+                f.write(json.dumps(entry) + "\n")
+            size = f.tell()
+        FileStorage.__journal_offset = size
+        self.__seen[self.__journal_path] = \
+            self.__signature(self.__journal_path)
+        if size > self.__journal_max:
+            self.compact()
+
+    def __repair(self):
+        """cuts off the journal from its first entry past the part applied
+        that is incomplete or unreadable, left by an interrupted save; the
+        caller holds the write locks, so no save is being appended"""
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
+            with open(self.__journal_path, 'rb+') as f:
+                offset = self.__journal_offset
+                f.seek(offset)
+                for line in iter(f.readline, b""):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete entry")
+                        json.loads(line)
+                    except ValueError:
+                        f.truncate(offset)
+                        break
+                    offset += len(line)
         except FileNotFoundError:
             pass
 
+    def __records(self):
+        """returns a copy of __objects completed by the fragments of the
+        objects not materialized"""
+        self.__format()
+        records = dict(self.__raw)
+        records.update(self.__objects)
+        return records
+
+    def __shard(self, name):
+        """returns the path of the storage file of the class called name"""
+        return os.path.join(self.__shards_path,
+                            name + self.__format().extension)
+
+    def __changes(self):
+        """
+        Collects what the next snapshot writes and starts tracking the
+        changes made after it
+
+        Return: a copy of the records, the keys changed since the last
+                snapshot and, when sharded, the keys of each shard to write
+                again (those with changed or removed objects, or no file)
+        """
+        objects = self.__records()
+        dirty, FileStorage.__dirty = self.__dirty, set()
+        removed, FileStorage.__removed = self.__removed, set()
+        if self.__shards_path is None:
+            return objects, dirty, None
+        names = removed | {key.partition(".")[0] for key in dirty}
+        names.update(name for name in self.__classes
+                     if not os.path.exists(self.__shard(name)))
+        return objects, dirty, {name: list(self.__classes.get(name, ()))
+                                for name in names}
+
+    def __snapshot(self, objects, dirty, shards=None):
+        """writes every object (or fragment) of objects to the storage
+        file, or the keys of each of shards to the file of their class,
+        through a temporary file so readers never see a partial write
+
+        Only the objects whose key is in dirty are serialized again, the
+        others are written from their cached text, unless the string table
+        of the format is stale: every object is then encoded again with a
+        new instance of the format.
+        """
+        fmt = self.__format()
+        old = None
+        if fmt.stale(len(objects)):
+            old, fmt = fmt, type(fmt)()
+        fresh = {}
+        try:
+            for key in dirty if old is None else objects:
+                obj = objects.get(key)
+                if isinstance(obj, (str, bytes)):
+                    fresh[key] = obj if old is None else \
+                        fmt.dump(key, old.load(key, obj))
+                elif obj is not None:
+                    fresh[key] = fmt.dump(key, obj.to_dict(False))
+        except Exception:
+            with self.__lock:
+                self.__dirty.update(dirty)
+                self.__removed.update(shards or ())
+            raise
+        with self.__lock:
+            if old is not None:
+                self.__reformat(old, fmt, objects, fresh)
+            fragments = self.__fragments
+            fragments.update(fresh)
+        try:
+            if shards is None:
+                self.__write(self.__file_path, fmt,
+                             filter(None, map(fragments.get, objects)))
+                return
+            os.makedirs(self.__shards_path, exist_ok=True)
+            for name, keys in shards.items():
+                self.__write(self.__shard(name), fmt,
+                             filter(None, map(fragments.get, keys)))
+        except Exception:
+            with self.__lock:
+                self.__removed.update(shards or ())
+            raise
+
+    def __reformat(self, old, fmt, objects, fresh):
+        """replaces the format old by fmt, with the fragments fresh of the
+        copy objects encoded by fmt; the caller holds __lock"""
+        fmt.kept = len(fmt.strings)
+        for key, raw in self.__raw.items():
+            if objects.get(key) is raw:
+                self.__raw[key] = fresh[key]
+            else:
+                self.__raw[key] = fmt.dump(key, old.load(key, raw))
+        FileStorage.__fragments = {}
+        FileStorage.__fragments_format = fmt
+
+    def __write(self, path, fmt, fragments):
+        """writes fragments to the file at path in the format fmt, through
+        a temporary file"""
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, 'wb' if fmt.binary else 'w') as f:
+            fmt.write(f, fragments)
+        os.replace(tmp_path, path)
+        self.__seen[path] = self.__signature(path)
+
+    def __signature(self, path):
+        """returns the (mtime, size, inode) of the file at path, or None if
+        it does not exist"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def compact(self):
+        """folds the journal into a new snapshot and empties it"""
+        with self.__write_lock:
+            with self.__file_lock(True):
+                with self.__lock:
+                    self.__sync()
+                    changes = self.__changes()
+                    FileStorage.__pending = {}
+                self.__snapshot(*changes)
+                if self.__journal_path is not None:
+                    open(self.__journal_path, 'w').close()
+                    FileStorage.__journal_offset = 0
+                    self.__seen[self.__journal_path] = \
+                        self.__signature(self.__journal_path)
+
+    def __replay(self, local=(), seen=None, offset=0):
+        """applies the entries of the journal to __objects, from the byte
+        offset, stopping before a last entry still being appended (or left
+        incomplete by an interrupted save, which the next save cuts off)
+
+        The keys in local are left alone, and the keys in the journal are
+        added to (or discarded from, when deleted) the set seen if any.
+        """
+        try:
+            with open(self.__journal_path, 'rb') as f:
+                f.seek(offset)
+                for line in iter(f.readline, b""):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete entry")
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    offset += len(line)
+                    key = entry["key"]
+                    if seen is not None:
+                        if entry["op"] == "delete":
+                            seen.discard(key)
+                        else:
+                            seen.add(key)
+                    if key in local:
+                        continue
+                    if entry["op"] == "delete":
+                        if key in self.__objects or key in self.__raw:
+                            self.__remove(key)
+                    else:
+                        self.__build(key, entry["obj"])
+        except FileNotFoundError:
+            offset = 0
+        FileStorage.__journal_offset = offset
+        self.__seen[self.__journal_path] = \
+            self.__signature(self.__journal_path)
+
+    def __files(self):
+        """returns the (path, class name) of each storage file, with None
+        as the class name of the single JSON file"""
+        if self.__shards_path is None or \
+                not os.path.isdir(self.__shards_path):
+            return [(self.__file_path, None)]
+        return [(self.__shard(name), name) for name in classes]
+
+    def __read(self):
+        """
+        Reads the storage file, or the file of each class when sharded
+
+        The shards are read by a pool of worker threads (or processes),
+        which also build the objects unless the storage is lazy, when they
+        are large enough to be worth it. The reload run by the import of
+        the models package always uses threads.
+
+        Return: an iterator of the format instance that read each file
+                (a copy of the storage one for a worker process) and an
+                iterator of its (key, object or dictionary, fragment)
+                entries
+        """
+        fmt = self.__format()
+        build = self.__cache_size is None
+        files = self.__files()
+        for path, name in files:
+            self.__seen[path] = self.__signature(path)
+        if files[0][1] is None:
+            return [(fmt, read_entries(self.__file_path, fmt, build))]
+        paths = sorted((path for path, name in files if self.__seen[path]),
+                       key=os.path.getsize, reverse=True)
+        workers = min(self.__reload_workers, len(paths))
+        if workers < 2 or \
+                sum(map(os.path.getsize, paths)) < self.__parallel_min:
+            return [(fmt, read_entries(path, fmt, build)) for path in paths]
+        if self.__reload_pool == "thread" or self.__importing() or \
+                "fork" not in multiprocessing.get_all_start_methods():
+            pool = ThreadPoolExecutor(workers)
+        else:
+            pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("fork"))
+        with pool:
+            return list(pool.map(read_file, paths, repeat(fmt),
+                                 repeat(build)))
+
+    def __importing(self):
+        """returns whether the models package is still being imported, when
+        a process pool would wait forever: it pickles read_file by name,
+        which needs the import lock of the package"""
+        spec = getattr(sys.modules.get("models"), "__spec__", None)
+        return getattr(spec, "_initializing", False)
+
+    def reload(self):
+        """deserializes the JSON file (or the file of each class when
+        sharded) to __objects
+
+        A missing shards directory is read from the JSON file instead,
+        which the next save splits into shards.
+        """
+        with self.__write_lock:
+            with self.__file_lock(False) as fd:
+                with self.__lock:
+                    if fd is not None:
+                        FileStorage.__generation = self.__read_generation(fd)
+                    FileStorage.__sorted = {}
+                    fmt = self.__format()
+                    for file_format, entries in self.__read():
+                        same = file_format is fmt or fmt.merge(file_format)
+                        for key, record, fragment in entries:
+                            self.__build(key, record,
+                                         fragment if same else None)
+                    if self.__journal_path is not None:
+                        self.__replay()
+
+    def __lock_path(self):
+        """returns the path of the lock file of the storage"""
+        return (self.__shards_path or self.__file_path) + ".lock"
+
+    def __read_generation(self, fd):
+        """returns the generation in the header of the lock file fd"""
+        header = os.pread(fd, 8, 0)
+        return int.from_bytes(header, "little") if len(header) == 8 else 0
+
+    @contextmanager
+    def __file_lock(self, exclusive):
+        """
+        Holds the lock file of the storage in multiprocess mode, shared to
+        read the storage files or exclusive to write them, and bumps the
+        generation when an exclusive hold ends; the caller holds
+        __write_lock
+
+        Yields the descriptor of the lock file, or None when not
+        multiprocess or already held exclusively by this thread.
+        """
+        if not self.__multiprocess or \
+                self.__lock_holder == threading.get_ident():
+            yield None
+            return
+        fd = os.open(self.__lock_path(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            if not exclusive:
+                yield fd
+                return
+            FileStorage.__lock_holder = threading.get_ident()
+            try:
+                self.__catch_up(fd)
+                yield fd
+            finally:
+                FileStorage.__lock_holder = None
+                generation = self.__read_generation(fd) + 1
+                os.pwrite(fd, generation.to_bytes(8, "little"), 0)
+                FileStorage.__generation = generation
+        finally:
+            os.close(fd)
+
+    def __catch_up(self, fd):
+        """applies the saves of other processes when the generation in the
+        lock file fd is not the one last read or written"""
+        generation = self.__read_generation(fd)
+        if generation != self.__generation:
+            self.__apply_changes()
+            FileStorage.__generation = generation
+
+    def __apply_changes(self):
+        """
+        Applies the changes made to the storage files since this process
+        last read or wrote them, keeping the local changes not saved yet
+
+        Only the files whose mtime, size or inode changed are read again
+        (the journal from where it was last applied, when the snapshot did
+        not change), and only their records whose encoding changed are
+        built again. The objects gone from a file read again are removed.
+        """
+        with self.__lock:
+            self.__sync()
+            fmt = self.__format()
+            local = set(self.__pending)
+            files = [(path, name) for path, name in self.__files()
+                     if self.__signature(path) != self.__seen.get(path)]
+            owned = set()
+            seen = set()
+            for path, name in files:
+                if name is None:
+                    owned.update(self.__raw)
+                    owned.update(self.__objects)
+                else:
+                    owned.update(self.__classes.get(name, ()))
+                self.__seen[path] = self.__signature(path)
+                for key, record, fragment in read_entries(path, fmt, False):
+                    seen.add(key)
+                    if key not in local and \
+                            self.__fragments.get(key) != fragment:
+                        self.__build(key, record, fragment)
+            journal = self.__journal_path
+            if journal is not None and files:
+                self.__replay(local, seen)
+            elif journal is not None and \
+                    self.__signature(journal) != self.__seen.get(journal):
+                self.__replay(local, offset=self.__journal_offset)
+            for key in owned - seen - local:
+                self.__remove(key)
+
+    def refresh(self):
+        """applies the saves other processes made since the storage was
+        last read or written, in multiprocess mode, before all(), find(),
+        get() and count() read it
+
+        The generation is read from the header of the lock file, kept open,
+        so an unchanged storage costs one read of 8 bytes.
+        """
+        if not self.__multiprocess:
+            return
+        if self.__watch is None or self.__watch[0] != os.getpid():
+            fd = os.open(self.__lock_path(), os.O_RDWR | os.O_CREAT, 0o644)
+            FileStorage.__watch = (os.getpid(), fd)
+        if self.__read_generation(self.__watch[1]) == self.__generation:
+            return
+        with self.__write_lock:
+            with self.__file_lock(False) as fd:
+                self.__catch_up(fd)
+
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__lock:
+                if key in self.__objects or key in self.__raw:
+                    self.__remove(key)
+                    self.__pending[key] = None
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """applies the changes made to the storage files since they were
+        last read or written, unless saves are still waiting to be written
+        to them (or calls refresh() in multiprocess mode)
+
+        Nothing is read when no file changed, which is checked from their
+        mtime, size and inode without taking the write lock, so closing
+        never waits for a save being written. A change found while a save
+        is being written is left to the next close, as the save records
+        the files it writes itself.
+        """
+        if self.__multiprocess:
+            self.refresh()
+            return
+        if not self.__changed():
+            return
+        if not self.__write_lock.acquire(blocking=False):
+            return
+        try:
+            with self.__lock:
+                waiting = bool(self.__waiting)
+            if not waiting:
+                self.__apply_changes()
+        finally:
+            self.__write_lock.release()
+
+    def __changed(self):
+        """returns whether a storage file or the journal is not as this
+        process last read or wrote it"""
+        paths = [path for path, name in self.__files()]
+        if self.__journal_path is not None:
+            paths.append(self.__journal_path)
+        return any(self.__signature(path) != self.__seen.get(path)
+                   for path in paths)
 
     def get(self, cls, id):
         """
@@ -77,12 +1286,17 @@ class FileStorage:
             cls:(obj) the class of the object to return
             id: string representing the object ID
         """
-        if cls is None or cls in classes.keys() or cls in classes.values():
-            objects = self.all(cls)
-            for object in objects:
-                object_id = object.split(".")[1]
-                if object_id == id:
-                    return objects[object]
+        self.refresh()
+        if cls is None:
+            names = classes.keys()
+        elif cls in classes.keys() or cls in classes.values():
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        else:
+            return None
+        for name in names:
+            obj = self.__object("{}.{}".format(name, id))
+            if obj is not None:
+                return obj
 
     def count(self, cls=None):
         """
@@ -92,7 +1306,18 @@ class FileStorage:
         Args:
             cls: class (optional) the class to count in the storage
         """
-        if cls is None or cls in classes.keys() or cls in classes.values():
-            objects = self.all(cls)
-            return len(objects)
+        self.refresh()
+        self.__sync()
+        if cls is None:
+            return sum(len(keys) for keys in list(self.__classes.values()))
+        if cls in classes.keys() or cls in classes.values():
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            return len(self.__classes.get(cls, {}))
         return 0
+
+    def counts(self):
+        """returns the number of objects of each class, by class name"""
+        self.refresh()
+        self.__sync()
+        return {name: len(self.__classes.get(name, {})) for name in classes}
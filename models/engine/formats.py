@@ -0,0 +1,434 @@
+#!/usr/bin/python3
+"""
+Contains the storage file formats used by FileStorage
+
+Each format reads a storage file entry by entry and writes it back from the
+cached encoding ("fragment") of each object, so neither side needs the whole
+document in memory at once. The format of a file is picked from its
+extension, unless FileStorage is given one by the HBNB_FILE_FORMAT
+environment variable (json, jsonl or binary).
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice
+import json
+import os
+import re
+import struct
+import threading
+
+# whitespace allowed between JSON tokens
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# binary encodings of lengths and indexes, integers and floats
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+MICROSECOND = timedelta(microseconds=1)
+
+
+class JSONFormat:
+    """a JSON object mapping each <class name>.id key to the dictionary of
+    its object"""
+    name = "json"
+    extension = ".json"
+    binary = False
+
+    def dump(self, key, record):
+        """returns the fragment of the dictionary record stored under key"""
+        return self.fragment(key, json.dumps(record))
+
+    def load(self, key, fragment):
+        """returns the dictionary of the object in fragment"""
+        return json.loads(fragment[len(json.dumps(key)) + 2:])
+
+    def merge(self, other):
+        """adds what other learned reading a file to this format, and
+        returns whether the fragments other read are valid for this one"""
+        return True
+
+    def stale(self, count):
+        """returns False, there is no string table to rebuild"""
+        return False
+
+    def fragment(self, key, text):
+        """returns the fragment of the object whose JSON text is text"""
+        return json.dumps(key) + ": " + text
+
+    def read(self, f, chunk_size=1 << 16):
+        """
+        Parses the JSON object in f one member at a time
+
+        Args:
+            f: the storage file, opened for reading text
+            chunk_size: number of characters read from f at once
+
+        Return: an iterator of (key, dictionary, fragment) tuples
+        """
+        decode = json.JSONDecoder().raw_decode
+        state = {"buf": "", "pos": 0, "eof": False}
+
+        def fill():
+            """appends the next chunk of f to the buffer"""
+            chunk = f.read(chunk_size)
+            if not chunk:
+                state["eof"] = True
+            state["buf"] = state["buf"][state["pos"]:] + chunk
+            state["pos"] = 0
+
+        def token():
+            """returns the next character that is not whitespace"""
+            while True:
+                pos = WHITESPACE.match(state["buf"], state["pos"]).end()
+                state["pos"] = pos
+                if pos < len(state["buf"]):
+                    return state["buf"][pos]
+                if state["eof"]:
+                    raise ValueError("unexpected end of JSON file")
+                fill()
+
+        def value():
+            """decodes the next JSON value, reading more of f until it is
+            complete"""
+            while True:
+                start = state["pos"]
+                try:
+                    obj, end = decode(state["buf"], start)
+                except ValueError:
+                    if state["eof"]:
+                        raise
+                    fill()
+                    continue
+                state["pos"] = end
+                return obj, state["buf"][start:end]
+
+        if token() != "{":
+            raise ValueError("storage file is not a JSON object")
+        state["pos"] += 1
+        if token() == "}":
+            return
+        while True:
+            token()
+            key = value()[0]
+            if token() != ":":
+                raise ValueError("expected ':' after {}".format(key))
+            state["pos"] += 1
+            token()
+            obj, text = value()
+            yield key, obj, self.fragment(key, text)
+            separator = token()
+            state["pos"] += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("expected ',' or '}' after {}".format(key))
+
+    def write(self, f, fragments, batch=4096):
+        """writes the fragments to f, batch of them at a time"""
+        fragments = iter(fragments)
+        f.write("{")
+        chunk = ", ".join(islice(fragments, batch))
+        while chunk:
+            f.write(chunk)
+            chunk = ", ".join(islice(fragments, batch))
+            if chunk:
+                f.write(", ")
+        f.write("}")
+
+
+class JSONLinesFormat:
+    """one line per object holding the JSON dictionary of the object"""
+    name = "jsonl"
+    extension = ".jsonl"
+    binary = False
+
+    def dump(self, key, record):
+        """returns the fragment of the dictionary record stored under key"""
+        return json.dumps(record)
+
+    def load(self, key, fragment):
+        """returns the dictionary of the object in fragment"""
+        return json.loads(fragment)
+
+    def merge(self, other):
+        """adds what other learned reading a file to this format, and
+        returns whether the fragments other read are valid for this one"""
+        return True
+
+    def stale(self, count):
+        """returns False, there is no string table to rebuild"""
+        return False
+
+    def read(self, f):
+        """
+        Parses the lines of f one at a time
+
+        Args:
+            f: the storage file, opened for reading text
+
+        Return: an iterator of (key, dictionary, fragment) tuples
+        """
+        for line in f:
+            line = line.strip()
+            if line:
+                obj = json.loads(line)
+                yield obj["__class__"] + "." + obj["id"], obj, line
+
+    def write(self, f, fragments, batch=4096):
+        """writes the fragments to f, one per line"""
+        fragments = iter(fragments)
+        chunk = list(islice(fragments, batch))
+        while chunk:
+            f.write("\n".join(chunk) + "\n")
+            chunk = list(islice(fragments, batch))
+
+
+class BinaryFormat:
+    """
+    Length-prefixed binary records: a tag byte and the 32 bit length of
+    the payload, after a magic header
+
+    A string record (b"S") appends its UTF-8 payload to the string table of
+    the file, which holds the attribute names, class names and foreign key
+    ids; values refer to them by index. An object record (b"O") holds the
+    dictionary of one object, with created_at and updated_at as integer
+    microseconds since the epoch.
+    The string table only grows, so the cached fragments stay valid between
+    writes; the strings of deleted objects are dropped when a snapshot finds
+    it stale and encodes every object again with a new table, or by a
+    conversion.
+    """
+    name = "binary"
+    extension = ".bin"
+    binary = True
+    magic = b"HBNB\x00\x01"
+    datetimes = ("created_at", "updated_at")
+    epoch = datetime(1970, 1, 1)
+    # integer - number of strings past twice the number of objects before
+    # the string table is stale
+    slack = 1024
+
+    def __init__(self):
+        """initializes an empty string table"""
+        self.strings = []
+        self.refs = {}
+        self.lock = threading.Lock()
+        # integer - number of strings of the table when it was rebuilt
+        self.kept = 0
+
+    def __getstate__(self):
+        """returns the string table, to send the format to another
+        process"""
+        return self.strings
+
+    def __setstate__(self, strings):
+        """rebuilds the format from the string table of another process"""
+        self.__init__()
+        for string in strings:
+            self.ref(string)
+
+    def merge(self, other):
+        """adds the string table of other to this one, and returns whether
+        the fragments other read use the same indexes"""
+        same = True
+        for i, string in enumerate(other.strings):
+            same = self.ref(string) == U32.pack(i) and same
+        return same
+
+    def stale(self, count):
+        """returns whether the string table holds more than twice the
+        strings count objects refer to (the attribute and class names, and
+        foreign keys, the ids of other objects) and than it was rebuilt
+        with, the others being left by objects gone"""
+        return len(self.strings) > 2 * max(count, self.kept) + self.slack
+
+    def ref(self, string):
+        """returns the packed index of string in the string table, adding
+        it"""
+        ref = self.refs.get(string)
+        if ref is None:
+            with self.lock:
+                ref = self.refs.get(string)
+                if ref is None:
+                    ref = U32.pack(len(self.strings))
+                    self.strings.append(string)
+                    self.refs[string] = ref
+        return ref
+
+    def encode(self, value, out, interned=False):
+        """appends the encoding of value to the bytearray out, as a string
+        table reference if interned is true and value is a string"""
+        if isinstance(value, str):
+            if interned:
+                out += b"r" + self.ref(value)
+            else:
+                data = value.encode()
+                out += b"s" + U32.pack(len(data)) + data
+        elif value is None:
+            out += b"N"
+        elif value is True:
+            out += b"T"
+        elif value is False:
+            out += b"F"
+        elif isinstance(value, int) and -1 << 63 <= value < 1 << 63:
+            out += b"i" + I64.pack(value)
+        elif isinstance(value, float):
+            out += b"f" + F64.pack(value)
+        elif isinstance(value, (list, tuple)):
+            out += b"l" + U32.pack(len(value))
+            for item in value:
+                self.encode(item, out, interned)
+        elif isinstance(value, dict):
+            self.encode_dict(value, out)
+        else:
+            data = json.dumps(value).encode()
+            out += b"j" + U32.pack(len(data)) + data
+
+    def encode_dict(self, record, out):
+        """appends the encoding of the dictionary record to out"""
+        out += b"m" + U32.pack(len(record))
+        for attr, value in record.items():
+            out += self.ref(attr)
+            if attr in self.datetimes and isinstance(value, str) and \
+                    len(value) == 26 and value[10] == "T":
+                try:
+                    us = (datetime.fromisoformat(value) - self.epoch) // \
+                        MICROSECOND
+                except ValueError:
+                    pass
+                else:
+                    out += b"d" + I64.pack(us)
+                    continue
+            self.encode(value, out, attr == "__class__" or
+                        attr.endswith("_id") or attr.endswith("_ids"))
+
+    def decode(self, data, pos, strings):
+        """returns the value encoded at pos in data, resolving references
+        with strings, and the position after it"""
+        tag = data[pos]
+        pos += 1
+        if tag == 0x72:  # r
+            return strings[U32.unpack_from(data, pos)[0]], pos + 4
+        if tag == 0x73 or tag == 0x6a:  # s, j
+            end = pos + 4 + U32.unpack_from(data, pos)[0]
+            text = bytes(data[pos + 4:end]).decode()
+            return text if tag == 0x73 else json.loads(text), end
+        if tag == 0x64:  # d
+            value = self.epoch + MICROSECOND * I64.unpack_from(data, pos)[0]
+            return value.isoformat(timespec="microseconds"), pos + 8
+        if tag == 0x69:  # i
+            return I64.unpack_from(data, pos)[0], pos + 8
+        if tag == 0x66:  # f
+            return F64.unpack_from(data, pos)[0], pos + 8
+        if tag == 0x4e:  # N
+            return None, pos
+        if tag == 0x54:  # T
+            return True, pos
+        if tag == 0x46:  # F
+            return False, pos
+        if tag == 0x6c:  # l
+            size = U32.unpack_from(data, pos)[0]
+            pos += 4
+            items = []
+            for i in range(size):
+                item, pos = self.decode(data, pos, strings)
+                items.append(item)
+            return items, pos
+        if tag == 0x6d:  # m
+            size = U32.unpack_from(data, pos)[0]
+            pos += 4
+            record = {}
+            for i in range(size):
+                attr = strings[U32.unpack_from(data, pos)[0]]
+                record[attr], pos = self.decode(data, pos + 4, strings)
+            return record, pos
+        raise ValueError("unknown tag {!r} in binary storage file".format(
+            chr(tag)))
+
+    def dump(self, key, record):
+        """returns the fragment of the dictionary record stored under key"""
+        out = bytearray()
+        self.encode_dict(record, out)
+        return b"O" + U32.pack(len(out)) + bytes(out)
+
+    def load(self, key, fragment):
+        """returns the dictionary of the object in fragment"""
+        return self.decode(fragment, 5, self.strings)[0]
+
+    def read(self, f, chunk_size=1 << 16):
+        """
+        Parses the records of f one at a time
+
+        The strings of the file are added to the string table; the objects
+        are encoded again when the file numbered them differently.
+
+        Args:
+            f: the storage file, opened for reading bytes
+            chunk_size: number of bytes read from f at once
+
+        Return: an iterator of (key, dictionary, fragment) tuples
+        """
+        if f.read(len(self.magic)) != self.magic:
+            raise ValueError("storage file is not a binary storage file")
+        strings = []
+        same = True
+        buf = b""
+        pos = 0
+        while True:
+            if len(buf) - pos < 5 or \
+                    len(buf) - pos < 5 + U32.unpack_from(buf, pos + 1)[0]:
+                chunk = f.read(max(chunk_size, len(buf) - pos + 5))
+                if not chunk:
+                    if pos < len(buf):
+                        raise ValueError("incomplete binary storage file")
+                    return
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            tag = buf[pos:pos + 1]
+            end = pos + 5 + U32.unpack_from(buf, pos + 1)[0]
+            if tag == b"S":
+                string = buf[pos + 5:end].decode()
+                same = same and \
+                    self.ref(string) == U32.pack(len(strings))
+                strings.append(string)
+            elif tag == b"O":
+                record = self.decode(buf, pos + 5, strings)[0]
+                key = record["__class__"] + "." + record["id"]
+                if same:
+                    yield key, record, buf[pos:end]
+                else:
+                    yield key, record, self.dump(key, record)
+            else:
+                raise ValueError("unknown record {!r} in binary storage "
+                                 "file".format(tag))
+            pos = end
+
+    def write(self, f, fragments, batch=4096):
+        """writes the fragments to f, batch of them at a time, each after
+        the strings added to the string table before it"""
+        fragments = iter(fragments)
+        f.write(self.magic)
+        written = 0
+        chunk = list(islice(fragments, batch))
+        while chunk:
+            table = [b"S" + U32.pack(len(data)) + data
+                     for data in (string.encode() for string in
+                                  self.strings[written:len(self.strings)])]
+            written += len(table)
+            f.write(b"".join(table + chunk))
+            chunk = list(islice(fragments, batch))
+
+
+formats = {"json": JSONFormat, "jsonl": JSONLinesFormat,
+           "binary": BinaryFormat}
+extensions = {cls.extension: name for name, cls in formats.items()}
+
+
+def format_for(path, name=None):
+    """returns a new instance of the format called name, or of the format
+    of the storage file at path by its extension"""
+    if name is None:
+        name = extensions.get(os.path.splitext(path)[1], "json")
+    if name not in formats:
+        raise ValueError("unknown storage file format: {}".format(name))
+    return formats[name]()
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""
+Contains the class MemoryStorage
+"""
+
+from concurrent.futures import Future
+from models.engine.file_storage import FileStorage
+
+
+class MemoryStorage(FileStorage):
+    """keeps the instances in memory only, with the indexes and queries of
+    FileStorage but no file to write or read"""
+
+    def save(self):
+        """
+        Forgets the changes tracked for the next write, as there is none
+
+        Return: a Future already resolved, as FileStorage.save returns
+        """
+        self.flush()
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def flush(self):
+        """forgets the changes tracked since the last save"""
+        self._discard_changes()
+
+    def compact(self):
+        """forgets the changes tracked since the last save"""
+        self.flush()
+
+    def reload(self):
+        """keeps the objects in memory, there is no file to read them from"""
+        pass
+
+    def refresh(self):
+        """does nothing, no other process shares the objects"""
+        pass
+
+    def close(self):
+        """does nothing, no other writer changes the objects"""
+        pass
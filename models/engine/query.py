@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+"""
+Contains the Query class, built by storage.query(cls)
+
+A query is refined by filter(), order_by(), after(), limit(), offset() and
+load(), each returning a new query, and run by all(), first() or count().
+Filters are given as attr=value, or attr__<operator>=value with one of the
+operators below. Each storage engine runs the query its own way: DBStorage
+compiles it to one SQL statement (plus one per relationship loaded) and
+FileStorage reads it from its indexes.
+"""
+
+from itertools import islice
+import operator
+
+# comparison of each filter operator, applied as (attribute value, value)
+operators = {"eq": operator.eq, "ne": operator.ne, "lt": operator.lt,
+             "le": operator.le, "gt": operator.gt, "ge": operator.ge,
+             "in": lambda value, values: value in values}
+
+
+class Query:
+    """a query on the objects of a class"""
+
+    def __init__(self, cls):
+        """
+        Instantiates a query matching every object of cls
+
+        Args:
+            cls: the class of the objects to return
+        """
+        # class - class of the objects to return
+        self.cls = cls
+        # tuple - (attribute, operator, value) that the objects must match
+        self.filters = ()
+        # tuple - (attribute, descending) the objects are sorted by
+        self.ordering = ()
+        # integer - number of matching objects skipped
+        self.start = 0
+        # integer - largest number of objects returned, None for no limit
+        self.size = None
+        # tuple - values of the ordering attributes of the object the
+        # objects returned come after, None to start from the first
+        self.cursor = None
+        # tuple - (relationship path, strategy) of the related objects
+        # loaded along with the objects
+        self.loads = ()
+
+    def __copy(self, **kwargs):
+        """returns a copy of the query with the attributes in kwargs"""
+        query = object.__new__(self.__class__)
+        query.__dict__.update(self.__dict__, **kwargs)
+        return query
+
+    def filter(self, **kwargs):
+        """
+        Returns the query also matching kwargs
+
+        Args:
+            kwargs: attr=value, or attr__<operator>=value
+        """
+        filters = []
+        for name, value in kwargs.items():
+            attr, sep, op = name.rpartition("__")
+            if not sep or op not in operators:
+                attr, op = name, "eq"
+            filters.append((attr, op, value))
+        return self.__copy(filters=self.filters + tuple(filters))
+
+    def order_by(self, *attrs):
+        """
+        Returns the query sorting the objects by attrs, in descending
+        order for the attributes prefixed by -
+        """
+        ordering = tuple((attr.lstrip("-"), attr.startswith("-"))
+                         for attr in attrs)
+        return self.__copy(ordering=self.ordering + ordering)
+
+    def after(self, *values):
+        """
+        Returns the query only returning the objects that come after
+        values in its ordering (keyset pagination)
+
+        Args:
+            values: the values of the ordering attributes of the last
+                    object of the previous page
+        """
+        if len(values) != len(self.ordering):
+            raise ValueError("after() needs one value per ordering attribute")
+        return self.__copy(cursor=values)
+
+    def limit(self, size):
+        """returns the query returning at most size objects"""
+        return self.__copy(size=size)
+
+    def offset(self, start):
+        """returns the query skipping the first start objects"""
+        return self.__copy(start=start)
+
+    def load(self, *paths, strategy="selectin"):
+        """
+        Returns the query also loading the related objects of each of
+        paths along with the objects, instead of one query per object when
+        its relationship is first read. Storages whose relationships are
+        not lazy ignore it.
+
+        Args:
+            paths: relationship names, dotted to follow the relationships
+                   of the related objects ("cities.places")
+            strategy: "selectin" for one more query per relationship, or
+                      "joined" to join the related objects to the query
+        """
+        if strategy not in ("selectin", "joined"):
+            raise ValueError("unknown loading strategy: {}".format(strategy))
+        loads = tuple((path, strategy) for path in paths)
+        return self.__copy(loads=self.loads + loads)
+
+    def all(self):
+        """returns the list of the objects matching the query"""
+        raise NotImplementedError
+
+    def first(self):
+        """returns the first object matching the query, or None"""
+        objects = self.limit(1).all()
+        return objects[0] if objects else None
+
+    def count(self):
+        """returns the number of objects all() would return"""
+        return len(self.all())
+
+    def __iter__(self):
+        """iterates over the objects matching the query"""
+        return iter(self.all())
+
+    def matches(self, obj):
+        """returns whether obj matches the filters of the query"""
+        for attr, op, value in self.filters:
+            try:
+                if not operators[op](getattr(obj, attr, None), value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def follows(self, obj):
+        """returns whether obj comes after the cursor of the query"""
+        for (attr, descending), value in zip(self.ordering, self.cursor):
+            own = getattr(obj, attr, None)
+            if own != value:
+                try:
+                    return own < value if descending else own > value
+                except TypeError:
+                    return False
+        return False
+
+    def arrange(self, objects):
+        """returns an iterator over objects sorted, skipped and limited as
+        the query asks"""
+        if self.cursor is not None:
+            objects = (obj for obj in objects if self.follows(obj))
+        if self.ordering:
+            objects = list(objects)
+        for attr, descending in reversed(self.ordering):
+            objects.sort(key=lambda obj: (getattr(obj, attr, None) is None,
+                                          getattr(obj, attr, None)),
+                         reverse=descending)
+        stop = None if self.size is None else self.start + self.size
+        return islice(objects, self.start, stop)
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""
+Contains the class SQLiteStorage
+"""
+
+from models.engine.db_storage import DBStorage
+from os import getenv
+from sqlalchemy import create_engine, event
+
+
+class SQLiteStorage(DBStorage):
+    """interacts with a local SQLite database file in WAL mode, through
+    the same SQLAlchemy models and sessions as DBStorage"""
+
+    def connect(self):
+        """
+        Returns the engine of the SQLite database file HBNB_SQLITE_PATH
+        (hbnb.db by default)
+
+        Each connection uses write-ahead logging, so readers run
+        concurrently with the writer, waits up to HBNB_SQLITE_TIMEOUT
+        seconds (30 by default) for the writer's lock, and enforces the
+        foreign keys as MySQL does.
+        """
+        HBNB_SQLITE_PATH = getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+        HBNB_SQLITE_TIMEOUT = float(getenv('HBNB_SQLITE_TIMEOUT', 30))
+        engine = create_engine('sqlite:///{}'.format(HBNB_SQLITE_PATH),
+                               connect_args={
+                                   'check_same_thread': False,
+                                   'timeout': HBNB_SQLITE_TIMEOUT})
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(connection, record):
+            """switches each new connection to WAL mode"""
+            cursor = connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        return engine
@@ -4,7 +4,8 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Index
+from sqlalchemy import Table
 from sqlalchemy.orm import relationship
 
 if models.storage_t == 'db':
@@ -23,14 +24,18 @@ class Place(BaseModel, Base):
     """Representation of Place """
     if models.storage_t == 'db':
         __tablename__ = 'places'
+        __table_args__ = (Index('ix_places_city_id_created_at', 'city_id',
+                                'created_at'),)
         city_id = Column(String(60), ForeignKey('cities.id'), nullable=False)
-        user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+        user_id = Column(String(60), ForeignKey('users.id'), nullable=False,
+                         index=True)
         name = Column(String(128), nullable=False)
         description = Column(String(1024), nullable=True)
-        number_rooms = Column(Integer, nullable=False, default=0)
-        number_bathrooms = Column(Integer, nullable=False, default=0)
-        max_guest = Column(Integer, nullable=False, default=0)
-        price_by_night = Column(Integer, nullable=False, default=0)
+        number_rooms = Column(Integer, nullable=False, default=0, index=True)
+        number_bathrooms = Column(Integer, nullable=False, default=0,
+                                  index=True)
+        max_guest = Column(Integer, nullable=False, default=0, index=True)
+        price_by_night = Column(Integer, nullable=False, default=0, index=True)
         latitude = Column(Float, nullable=True)
         longitude = Column(Float, nullable=True)
         reviews = relationship("Review", backref="place")
@@ -59,32 +64,25 @@ class Place(BaseModel, Base):
         def reviews(self):
             """getter attribute returns the list of Review instances"""
             from models.review import Review
-            review_list = []
-            all_reviews = models.storage.all(Review)
-            for review in all_reviews.values():
-                if review.place_id == self.id:
-                    review_list.append(review)
-            return review_list
+            return models.storage.find(Review, place_id=self.id)
 
         @property
         def amenities(self):
-            """returns the list of Amenity instances with place_id
-            equals the current place.id
+            """returns the list of Amenity instances whose id is listed in
+            amenity_ids
             """
             from models.amenity import Amenity
             amenity_list = []
-            all_amenities = models.storage.all(Amenity)
-            for amenity in all_amenities.values():
-                if amenity.place_id == self.id:
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get(Amenity, amenity_id)
+                if amenity is not None:
                     amenity_list.append(amenity)
             return amenity_list
 
         @amenities.setter
         def amenities(self, amenity=None):
-            """setter attribute returns the list of Amenity instances"""
+            """setter attribute adds the id of an Amenity to amenity_ids"""
             from models.amenity import Amenity
-            if amenity:
-                all_amenities = models.storage.all(Amenity)
-                for amenity in all_amenities.values():
-                    if amenity.place_id == self.id:
-                        self.amenity_ids.append(amenity.id)
+            if type(amenity) is Amenity and \
+               amenity.id not in self.amenity_ids:
+                self.amenity_ids = self.amenity_ids + [amenity.id]
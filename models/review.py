@@ -4,15 +4,18 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 
 
 class Review(BaseModel, Base):
     """Representation of Review """
     if models.storage_t == 'db':
         __tablename__ = 'reviews'
+        __table_args__ = (Index('ix_reviews_place_id_created_at', 'place_id',
+                                'created_at'),)
         place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
-        user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
+        user_id = Column(String(60), ForeignKey('users.id'), nullable=False,
+                         index=True)
         text = Column(String(1024), nullable=False)
     else:
         place_id = ""
@@ -13,7 +13,7 @@ class User(BaseModel, Base):
     """Representation of a user """
     if models.storage_t == 'db':
         __tablename__ = 'users'
-        email = Column(String(128), nullable=False)
+        email = Column(String(128), nullable=False, index=True)
         password = Column(String(128), nullable=False)
         first_name = Column(String(128), nullable=True)
         last_name = Column(String(128), nullable=True)
@@ -29,6 +29,19 @@ class User(BaseModel, Base):
         """initializes user"""
         super().__init__(*args, **kwargs)
 
+    if models.storage_t != 'db':
+        @property
+        def places(self):
+            """getter for list of place instances owned by the user"""
+            from models.place import Place
+            return models.storage.find(Place, user_id=self.id)
+
+        @property
+        def reviews(self):
+            """getter for list of review instances written by the user"""
+            from models.review import Review
+            return models.storage.find(Review, user_id=self.id)
+
     def __setattr__(self, key, value):
         """Hashes user password using md5"""
         if key == "password":
@@ -74,7 +74,7 @@ test_db_storage.py'])
                             "{:s} method needs a docstring".format(func[0]))
 
 
-@unittest.skipIf(models.storage_t != 'db', "Testing DBstorage")
+@unittest.skipIf(models.engine_t != 'db', "Testing DBstorage")
 class TestDBStorageMethods(unittest.TestCase):
     """Test the DBStorage class"""
     @classmethod
@@ -130,13 +130,53 @@ class TestDBStorageMethods(unittest.TestCase):
         num_amenity = self.storage.count(Amenity)
         self.assertTrue(num_amenity == 3)
 
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_counts(self):
+        """Test that counts returns the count of every class"""
+        counts = self.storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name in classes:
+            self.assertEqual(counts[name], self.storage.count(name))
+        self.assertEqual(sum(counts.values()), self.storage.count())
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_find(self):
+        """Test that find returns the objects matching the attributes"""
+        self.storage.create_index(Place, "name")
+        self.assertIn("ix_places_name",
+                      [index.name for index in Place.__table__.indexes])
+        self.assertEqual(self.storage.find(Place, name="House 1"),
+                         [self.place_1])
+        self.assertEqual(self.storage.find("User", email="john@snow.com"),
+                         [self.user])
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_query(self):
+        """Test that query filters, sorts and limits the objects"""
+        query = self.storage.query(Place).filter(city_id=self.city.id)
+        self.assertEqual(query.order_by("-name").all(),
+                         [self.place_2, self.place_1])
+        self.assertEqual(query.order_by("name").offset(1).first(),
+                         self.place_2)
+        self.assertEqual(query.filter(name__in=["House 1"]).count(), 1)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_query_after(self):
+        """Test that after pages through the objects in (created_at, id)
+        order"""
+        query = self.storage.query(Amenity).order_by("created_at", "id")
+        expected = query.all()
+        first = query.limit(2).all()
+        last = first[-1]
+        self.assertEqual(first + query.after(last.created_at, last.id).all(),
+                         expected)
+
     @classmethod
     def tearDownClass(cls):
         """ Cleans up at the end of the unit tests """
         cls.storage.close()
 
-    @unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') != 'db',
-                     "not testing db storage")
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_count(self):
         """Test adding an object to the database"""
         initial_count = models.storage.count("State")
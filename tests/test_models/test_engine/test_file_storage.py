@@ -5,8 +5,11 @@ Contains the TestFileStorageDocs classes
 
 from datetime import datetime
 import inspect
+import io
 import models
 from models.engine import file_storage
+from models.engine.convert import convert
+from models.engine.formats import BinaryFormat, JSONFormat
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -15,9 +18,15 @@ from models.review import Review
 from models.state import State
 from models.user import User
 import json
+import multiprocessing
 import os
 import pep8
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -72,11 +81,69 @@ class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_all_returns_dict(self):
-        """Test that all returns the FileStorage.__objects attr"""
+        """Test that all returns a read-only copy of FileStorage.__objects"""
         storage = FileStorage()
         new_dict = storage.all()
-        self.assertEqual(type(new_dict), dict)
-        self.assertIs(new_dict, storage._FileStorage__objects)
+        self.assertEqual(dict(new_dict), storage._FileStorage__objects)
+        self.assertIsNot(new_dict, storage._FileStorage__objects)
+        with self.assertRaises(TypeError):
+            new_dict["BaseModel.id"] = None
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_snapshot(self):
+        """Test that all returns the same snapshot until the objects change,
+        and that writes do not change a snapshot already returned"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        storage.new(state)
+        snapshot = storage.all()
+        states = storage.all(State)
+        self.assertIs(storage.all(), snapshot)
+        self.assertIs(storage.all(State), states)
+        city = City()
+        storage.new(city)
+        storage.delete(state)
+        self.assertEqual(dict(snapshot), {"State." + state.id: state})
+        self.assertEqual(dict(states), {"State." + state.id: state})
+        self.assertEqual(dict(storage.all()), {"City." + city.id: city})
+        self.assertEqual(dict(storage.all(State)), {})
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_while_writing(self):
+        """Test that all can be iterated while other threads write"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        errors = []
+
+        def write():
+            """adds and deletes states"""
+            for i in range(2000):
+                state = State()
+                storage.new(state)
+                storage.delete(state)
+
+        def read():
+            """iterates over the states"""
+            try:
+                for i in range(200):
+                    for key, obj in storage.all(State).items():
+                        pass
+                    storage.count(State)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write),
+                   threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        FileStorage._FileStorage__objects = save
+        self.assertEqual(errors, [])
 
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_new(self):
@@ -114,6 +181,869 @@ class TestFileStorage(unittest.TestCase):
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
 
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_serializes_changed_objects_only(self):
+        """Test that save only serializes the objects changed since"""
+        storage = FileStorage()
+        saved = (FileStorage._FileStorage__objects,
+                 FileStorage._FileStorage__file_path)
+        with tempfile.TemporaryDirectory() as tmp:
+            FileStorage._FileStorage__objects = {}
+            FileStorage._FileStorage__file_path = os.path.join(tmp, "f.json")
+            states = [State(name=str(i)) for i in range(3)]
+            for state in states:
+                storage.new(state)
+            storage.save()
+            states[1].name = "Arizona"
+            with mock.patch.object(State, "to_dict", autospec=True,
+                                   side_effect=State.to_dict) as to_dict:
+                storage.save()
+            self.assertEqual(to_dict.call_count, 1)
+            with open(FileStorage._FileStorage__file_path) as f:
+                js = json.load(f)
+            (FileStorage._FileStorage__objects,
+             FileStorage._FileStorage__file_path) = saved
+        self.assertEqual(js["State." + states[1].id]["name"], "Arizona")
+        self.assertEqual(js["State." + states[2].id]["name"], "2")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_with_cls(self):
+        """Test that all(cls) only returns objects of that class"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(storage.all(State), {"State." + state.id: state})
+        self.assertEqual(storage.all("City"), {"City." + city.id: city})
+        self.assertEqual(storage.all(Amenity), {})
+        storage.delete(city)
+        self.assertEqual(storage.all(City), {})
+        self.assertEqual(storage.count(City), 0)
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_foreign_key_indexes(self):
+        """Test that relationships follow new, delete and attribute changes"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state_1 = State()
+        state_2 = State()
+        city = City(state_id=state_1.id)
+        for obj in (state_1, state_2, city):
+            storage.new(obj)
+        self.assertEqual(state_1.cities, [city])
+        self.assertEqual(storage.find(City, state_id=state_1.id), [city])
+        city.state_id = state_2.id
+        self.assertEqual(state_1.cities, [])
+        self.assertEqual(state_2.cities, [city])
+        storage.delete(city)
+        self.assertEqual(state_2.cities, [])
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_create_index(self):
+        """Test that find reads a created index, which follows new, delete
+        and attribute changes"""
+        storage = FileStorage()
+        save = (FileStorage._FileStorage__objects, dict(file_storage.indexes))
+        FileStorage._FileStorage__objects = {}
+        place_1 = Place(name="House")
+        place_2 = Place(name="Loft")
+        storage.new(place_1)
+        storage.create_index(Place, "name")
+        storage.new(place_2)
+        index = FileStorage._FileStorage__indexes["Place.name"]
+        self.assertEqual(set(index), {"House", "Loft"})
+        self.assertEqual(storage.find(Place, name="House"), [place_1])
+        place_2.name = "House"
+        self.assertEqual(storage.find(Place, name="House"),
+                         [place_1, place_2])
+        self.assertNotIn("Loft", index)
+        storage.delete(place_1)
+        self.assertEqual(storage.find("Place", name="House"), [place_2])
+        (FileStorage._FileStorage__objects, indexes) = save
+        file_storage.indexes.clear()
+        file_storage.indexes.update(indexes)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_find_range(self):
+        """Test that find_range reads the sorted index, which follows new,
+        delete and attribute changes"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        places = [Place(price_by_night=price) for price in (120, 80, 100)]
+        for place in places:
+            storage.new(place)
+        self.assertEqual(storage.find_range(Place, "price_by_night", 90),
+                         [places[2], places[0]])
+        self.assertEqual(storage.find_range("Place", "price_by_night",
+                                            high=100),
+                         [places[1], places[2]])
+        places[0].price_by_night = 90
+        storage.delete(places[1])
+        extra = Place(price_by_night=95)
+        storage.new(extra)
+        self.assertEqual(storage.find_range(Place, "price_by_night", 80, 100),
+                         [places[0], extra, places[2]])
+        self.assertCountEqual(storage.find_range(Place, "latitude", 0.0),
+                              [places[0], extra, places[2]])
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_new_many_and_delete_many(self):
+        """Test that new_many and delete_many keep the hash and sorted
+        indexes in step, and are written by a single save"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        first = Place(city_id="c", price_by_night=50)
+        storage.new(first)
+        self.assertEqual(storage.find_range(Place, "price_by_night"),
+                         [first])
+        places = [Place(city_id="c", price_by_night=price)
+                  for price in (120, 80, 100)]
+        first.price_by_night = 110
+        storage.new_many(places + [first, None])
+        self.assertEqual(storage.find_range(Place, "price_by_night"),
+                         [places[1], places[2], first, places[0]])
+        self.assertEqual(len(storage.find(Place, city_id="c")), 4)
+        with mock.patch.object(FileStorage,
+                               "_FileStorage__write") as write:
+            storage.save()
+        self.assertEqual(write.call_count, 1)
+        storage.delete_many([places[1], first, None])
+        self.assertEqual(storage.find_range(Place, "price_by_night"),
+                         [places[2], places[0]])
+        self.assertCountEqual(storage.find(Place, city_id="c"),
+                              [places[0], places[2]])
+        self.assertEqual(storage.count(Place), 2)
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_query(self):
+        """Test that query filters, sorts and limits the objects, reading
+        them from an index when a filter has one"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        city_1 = City(name="Fremont")
+        city_2 = City(name="Napa")
+        places = [Place(city_id=city.id, name=name, price_by_night=price)
+                  for city, name, price in ((city_1, "b", 100),
+                                            (city_2, "a", 80),
+                                            (city_1, "c", 120),
+                                            (city_1, "a", 90))]
+        for obj in [city_1, city_2] + places:
+            storage.new(obj)
+        query = storage.query(Place).filter(city_id=city_1.id)
+        with mock.patch.object(storage, "all") as all_objects:
+            self.assertEqual(query.all(), [places[0], places[2], places[3]])
+            self.assertEqual(query.filter(price_by_night__gt=100).all(),
+                             [places[2]])
+            self.assertEqual(storage.query("Place").filter(
+                city_id__in=[city_2.id, city_1.id]).count(), 4)
+            all_objects.assert_not_called()
+        self.assertEqual(query.order_by("name", "-price_by_night").all(),
+                         [places[3], places[0], places[2]])
+        self.assertEqual(query.order_by("-name").limit(2).offset(1).all(),
+                         [places[0], places[3]])
+        self.assertEqual(storage.query(Place).filter(
+            price_by_night__le=100, name__ne="b").order_by("id").all(),
+            sorted([places[1], places[3]], key=lambda place: place.id))
+        self.assertIsNone(query.filter(name="d").first())
+        self.assertEqual(query.load("places").all(), query.all())
+        with self.assertRaises(ValueError):
+            query.load("places", strategy="lazy")
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_query_after(self):
+        """Test that after pages through the objects in (created_at, id)
+        order, from the sorted index or from a filtered bucket"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        storage.new(state)
+        cities = [City(state_id=state.id if i % 2 else "other")
+                  for i in range(9)]
+        for i, city in enumerate(cities):
+            city.created_at = datetime(2020, 1, 1, 0, 0, i // 3)
+            storage.new(city)
+        for query, expected in (
+                (storage.query(City), cities),
+                (storage.query(City).filter(state_id=state.id),
+                 cities[1::2])):
+            query = query.order_by("created_at", "id")
+            expected = sorted(expected,
+                              key=lambda city: (city.created_at, city.id))
+            pages = [query.limit(2).all()]
+            while pages[-1]:
+                last = pages[-1][-1]
+                pages.append(query.after(last.created_at, last.id)
+                             .limit(2).all())
+            self.assertEqual(sum(pages, []), expected)
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_iter(self):
+        """Test that iter yields the objects, or the objects of a class"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(list(storage.iter(State)), [state])
+        self.assertEqual(list(storage.iter("City")), [city])
+        self.assertEqual(list(storage.iter()), [state, city])
+        self.assertEqual(list(storage.iter(Amenity)), [])
+        with mock.patch.object(FileStorage, "all") as all_objects:
+            self.assertEqual(list(storage.iter(State)), [state])
+            all_objects.assert_not_called()
+        FileStorage._FileStorage__objects = save
+
+
+@unittest.skipIf(models.storage_t in ('db', 'memory'),
+                 "not testing file storage")
+class TestFileStorageJournal(unittest.TestCase):
+    """Test the FileStorage journal mode"""
+    def setUp(self):
+        """Points the storage at empty files in a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__journal_path)
+        self.journal = os.path.join(self.tmp.name, "file.json.log")
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = os.path.join(self.tmp.name,
+                                                           "file.json")
+        FileStorage._FileStorage__journal_path = self.journal
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__journal_path) = self.saved
+        FileStorage._FileStorage__pending.clear()
+        self.tmp.cleanup()
+
+    def test_save_appends_changes(self):
+        """Test that save only appends the objects changed since last save"""
+        state = State(name="California")
+        state.save()
+        city = City(state_id=state.id)
+        city.save()
+        with open(self.journal) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["key"] for e in entries],
+                         ["State." + state.id, "City." + city.id])
+        self.assertEqual(entries[1]["obj"]["state_id"], state.id)
+        state.delete()
+        self.storage.save()
+        with open(self.journal) as f:
+            last = json.loads(f.readlines()[-1])
+        self.assertEqual(last, {"op": "delete", "key": "State." + state.id})
+
+    def test_reload_replays_journal(self):
+        """Test that reload applies the journal on top of the snapshot"""
+        kept = State(name="Iowa")
+        kept.save()
+        self.storage.compact()
+        gone = State(name="Texas")
+        gone.save()
+        kept.name = "Ohio"
+        kept.save()
+        gone.delete()
+        self.storage.save()
+        with open(self.journal, "a") as f:
+            f.write('{"op": "new", "key": "Sta')
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all(State)),
+                         ["State." + kept.id])
+        self.assertEqual(self.storage.get(State, kept.id).name, "Ohio")
+        with open(self.journal) as f:
+            self.assertTrue(f.read().endswith('"Sta'))
+        added = State(name="Maine")
+        added.save()
+        with open(self.journal) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(entries[-1]["key"], "State." + added.id)
+
+    def test_close_during_append(self):
+        """Test that close stops before an entry another process is still
+        appending, and applies it once complete"""
+        kept = State(name="Iowa")
+        kept.save()
+        state = State(name="Vermont")
+        line = json.dumps({"op": "new", "key": "State." + state.id,
+                           "obj": state.to_dict(False)}) + "\n"
+        with open(self.journal, "a") as f:
+            f.write(line[:20])
+        size = os.path.getsize(self.journal)
+        self.storage.close()
+        self.assertEqual(os.path.getsize(self.journal), size)
+        self.assertIsNone(self.storage.get(State, state.id))
+        with open(self.journal, "a") as f:
+            f.write(line[20:])
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Vermont")
+
+    def test_compact(self):
+        """Test that the journal is folded into a snapshot past its limit"""
+        saved_max = FileStorage._FileStorage__journal_max
+        FileStorage._FileStorage__journal_max = 0
+        try:
+            state = State(name="Utah")
+            state.save()
+        finally:
+            FileStorage._FileStorage__journal_max = saved_max
+        self.assertEqual(os.path.getsize(self.journal), 0)
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertIn("State." + state.id, json.load(f))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageGroupCommit(unittest.TestCase):
+    """Test the FileStorage grouped saves"""
+    def setUp(self):
+        """Points the storage at a temporary file and groups saves"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__commit_interval,
+                      FileStorage._FileStorage__commit_batch)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = os.path.join(self.tmp.name,
+                                                           "file.json")
+        FileStorage._FileStorage__commit_interval = 0.05
+        FileStorage._FileStorage__commit_batch = 1000
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Writes what is left and restores the storage"""
+        self.storage.flush()
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__commit_interval,
+         FileStorage._FileStorage__commit_batch) = self.saved
+        self.tmp.cleanup()
+
+    def test_concurrent_saves_are_grouped(self):
+        """Test that concurrent saves are written together"""
+        futures = []
+        states = [State(name=str(i)) for i in range(20)]
+
+        def save(state):
+            """saves state from a thread"""
+            self.storage.new(state)
+            futures.append(self.storage.save())
+        threads = [threading.Thread(target=save, args=(state,))
+                   for state in states]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            self.assertIsNone(future.result(timeout=5))
+        with open(FileStorage._FileStorage__file_path) as f:
+            saved = json.load(f)
+        self.assertEqual(set(saved), {"State." + s.id for s in states})
+
+    def test_close_keeps_unwritten_changes(self):
+        """Test that close() does not reload over changes not written yet"""
+        state = State(name="Nevada")
+        state.save()
+        self.storage.close()
+        self.assertIs(self.storage.get(State, state.id), state)
+
+    def test_failed_write_raised_by_next_save(self):
+        """Test that the next save raises the exception of a grouped write
+        that failed, and that its changes are written later"""
+        path = FileStorage._FileStorage__file_path
+        FileStorage._FileStorage__file_path = os.path.join(
+            self.tmp.name, "missing", "file.json")
+        state = State(name="Kansas")
+        self.storage.new(state)
+        future = self.storage.save()
+        self.assertIsInstance(future.exception(timeout=5), FileNotFoundError)
+        FileStorage._FileStorage__file_path = path
+        with self.assertRaises(FileNotFoundError):
+            self.storage.save()
+        self.storage.flush()
+        with open(path) as f:
+            self.assertIn("State." + state.id, json.load(f))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageLazy(unittest.TestCase):
+    """Test the FileStorage lazy mode"""
+    def setUp(self):
+        """Saves a few objects to a temporary file and reloads it lazily"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__cache_size)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = os.path.join(self.tmp.name,
+                                                           "file.json")
+        self.storage = FileStorage()
+        self.state = State(name="Oregon")
+        self.cities = [City(state_id=self.state.id, name=str(i))
+                       for i in range(4)]
+        for obj in [self.state] + self.cities:
+            self.storage.new(obj)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__cache_size = 2
+        self.storage.reload()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__cache_size) = self.saved
+        FileStorage._FileStorage__raw.clear()
+        FileStorage._FileStorage__recent.clear()
+        self.tmp.cleanup()
+
+    def test_reload_materializes_nothing(self):
+        """Test that reload only keeps the raw dictionaries"""
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(self.storage.count(), 5)
+        self.assertEqual(self.storage.count(City), 4)
+
+    def test_access_materializes_within_cache_size(self):
+        """Test that objects are built on access and the cache is bounded"""
+        state = self.storage.get(State, self.state.id)
+        self.assertEqual(state.name, "Oregon")
+        self.assertIs(self.storage.get(State, self.state.id), state)
+        self.assertEqual(sorted(city.name for city in state.cities),
+                         ["0", "1", "2", "3"])
+        self.assertEqual(len(FileStorage._FileStorage__objects), 2)
+
+    def test_changed_objects_stay_and_save(self):
+        """Test that changed objects are kept and saved with the others"""
+        city = self.storage.get(City, self.cities[0].id)
+        city.name = "Portland"
+        self.assertEqual(len(self.storage.all(City)), 4)
+        self.assertIs(self.storage.get(City, city.id), city)
+        self.storage.save()
+        with open(FileStorage._FileStorage__file_path) as f:
+            js = json.load(f)
+        self.assertEqual(len(js), 5)
+        self.assertEqual(js["City." + city.id]["name"], "Portland")
+
+    def test_iter_materializes_within_cache_size(self):
+        """Test that iter yields every object with the cache bounded"""
+        names = []
+        for city in self.storage.iter(City):
+            names.append(city.name)
+            self.assertLessEqual(len(FileStorage._FileStorage__objects), 2)
+        self.assertEqual(sorted(names), ["0", "1", "2", "3"])
+        self.assertEqual(len(list(self.storage.iter())), 5)
+
+    def test_query_ordered_by_created_at(self):
+        """Test that the creation dates are read from the fragments"""
+        cities = self.storage.query(City).order_by("created_at", "id").all()
+        self.assertEqual([city.id for city in cities],
+                         [city.id for city in sorted(
+                             self.cities,
+                             key=lambda city: (city.created_at, city.id))])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageFormats(unittest.TestCase):
+    """Test the storage file formats"""
+    def setUp(self):
+        """Points the storage to a temporary directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path)
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path) = self.saved
+        self.tmp.cleanup()
+
+    def test_json_read_streams_entries(self):
+        """Test that the JSON format parses members across small chunks"""
+        data = {"State.1": {"id": "1", "name": "a, \"b\" {c}"},
+                "City.2": {"id": "2", "state_id": "1"}}
+        text = json.dumps(data, indent=2)
+        for chunk_size in (1, 7, 1 << 16):
+            entries = list(JSONFormat().read(io.StringIO(text), chunk_size))
+            self.assertEqual({k: v for k, v, f in entries}, data)
+            self.assertEqual({k: JSONFormat().load(k, f)
+                              for k, v, f in entries}, data)
+        with self.assertRaises(ValueError):
+            list(JSONFormat().read(io.StringIO('{"State.1": {}')))
+
+    def test_reload_reuses_file_text(self):
+        """Test that reloaded objects are not serialized again on save"""
+        path = os.path.join(self.tmp.name, "file.json")
+        FileStorage._FileStorage__file_path = path
+        state = State(name="Oregon")
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.storage.all()
+        with mock.patch.object(State, "to_dict") as to_dict:
+            self.storage.save()
+            to_dict.assert_not_called()
+        with open(path) as f:
+            self.assertEqual(json.load(f)["State." + state.id]["name"],
+                             "Oregon")
+
+    def test_json_lines(self):
+        """Test that a .jsonl file holds one object per line"""
+        path = os.path.join(self.tmp.name, "file.jsonl")
+        FileStorage._FileStorage__file_path = path
+        state = State(name="Oregon")
+        city = City(state_id=state.id, name="Portland")
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(sorted(line["id"] for line in lines),
+                         sorted([state.id, city.id]))
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.get(City, city.id).name, "Portland")
+        self.assertEqual(len(self.storage.find(City, state_id=state.id)), 1)
+
+    def test_binary(self):
+        """Test that a .bin file round trips objects and can be converted"""
+        path = os.path.join(self.tmp.name, "file.bin")
+        FileStorage._FileStorage__file_path = path
+        state = State(name="Oregon")
+        cities = [City(state_id=state.id, name="é" * i) for i in range(3)]
+        place = Place(city_id=cities[0].id, number_rooms=3, latitude=1.5,
+                      amenity_ids=["a", "b"], description=None)
+        for obj in [state, place] + cities:
+            self.storage.new(obj)
+        self.storage.save()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(6), BinaryFormat.magic)
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        for obj in [state, place] + cities:
+            self.assertEqual(self.storage.get(type(obj), obj.id).to_dict(),
+                             obj.to_dict())
+        self.assertEqual(len(self.storage.find(City, state_id=state.id)), 3)
+        copy = os.path.join(self.tmp.name, "copy.json")
+        self.assertEqual(convert(path, copy), 5)
+        with open(copy) as f:
+            self.assertEqual(json.load(f)["Place." + place.id],
+                             place.to_dict(False))
+
+    def test_binary_drops_strings(self):
+        """Test that a snapshot drops the strings of the deleted objects
+        from the string table of a .bin file, lazy or not"""
+        path = os.path.join(self.tmp.name, "file.bin")
+        FileStorage._FileStorage__file_path = path
+        saved = FileStorage._FileStorage__cache_size
+        self.addCleanup(setattr, FileStorage, "_FileStorage__cache_size",
+                        saved)
+        for cache_size in (None, 10):
+            FileStorage._FileStorage__cache_size = cache_size
+            FileStorage._FileStorage__objects = {}
+            self.storage.reload()
+            state = State(name="Oregon")
+            city = City(state_id=state.id, name="Salem")
+            self.storage.new_many([state, city])
+            self.storage.save()
+            gone = [City(state_id=str(i), name="x") for i in range(3000)]
+            self.storage.new_many(gone)
+            self.storage.save()
+            size = os.path.getsize(path)
+            self.storage.delete_many(gone)
+            self.storage.save()
+            self.assertLess(os.path.getsize(path), size / 10)
+            fmt = FileStorage._FileStorage__fragments_format
+            self.assertLess(len(fmt.strings), 1000)
+            self.assertEqual(self.storage.get(City, city.id).state_id,
+                             state.id)
+            FileStorage._FileStorage__objects = {}
+            self.storage.reload()
+            self.assertEqual(self.storage.get(City, city.id).state_id,
+                             state.id)
+            self.storage.delete_many([state, city])
+            self.storage.save()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageShards(unittest.TestCase):
+    """Test the FileStorage sharded layout"""
+    def setUp(self):
+        """Points the storage to a temporary shards directory"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__shards_path,
+                      FileStorage._FileStorage__parallel_min,
+                      FileStorage._FileStorage__reload_pool,
+                      FileStorage._FileStorage__reload_workers)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__shards_path = self.tmp.name
+        self.storage = FileStorage()
+        self.state = State(name="Oregon")
+        self.city = City(state_id=self.state.id, name="Portland")
+        self.storage.new(self.state)
+        self.storage.new(self.city)
+        self.storage.save()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__shards_path,
+         FileStorage._FileStorage__parallel_min,
+         FileStorage._FileStorage__reload_pool,
+         FileStorage._FileStorage__reload_workers) = self.saved
+        FileStorage._FileStorage__removed.clear()
+        self.tmp.cleanup()
+
+    def shard(self, name):
+        """Returns the objects saved in the shard of the class name"""
+        with open(os.path.join(self.tmp.name, name + ".json")) as f:
+            return json.load(f)
+
+    def test_one_file_per_class(self):
+        """Test that each class is saved to its own file"""
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ["City.json", "State.json"])
+        self.assertEqual(list(self.shard("City")), ["City." + self.city.id])
+
+    def test_save_writes_changed_shards_only(self):
+        """Test that save only rewrites the shards of changed classes"""
+        with mock.patch("os.replace", wraps=os.replace) as replace:
+            self.city.name = "Salem"
+            self.storage.save()
+        self.assertEqual([os.path.basename(call.args[1])
+                          for call in replace.call_args_list], ["City.json"])
+        self.assertEqual(self.shard("City")["City." + self.city.id]["name"],
+                         "Salem")
+        self.storage.delete(self.state)
+        self.storage.save()
+        self.assertEqual(self.shard("State"), {})
+
+    def test_parallel_reload(self):
+        """Test that the shards are reloaded by processes or threads"""
+        FileStorage._FileStorage__parallel_min = 0
+        FileStorage._FileStorage__reload_workers = 2
+        for pool in ("process", "thread"):
+            FileStorage._FileStorage__reload_pool = pool
+            FileStorage._FileStorage__objects = {}
+            self.storage.reload()
+            self.assertEqual(self.storage.get(City, self.city.id).name,
+                             "Portland")
+            self.assertEqual(self.storage.find(City, state_id=self.state.id),
+                             [self.storage.get(City, self.city.id)])
+
+    def test_import_reload(self):
+        """Test that importing models reloads large shards without waiting
+        forever for a process pool"""
+        date = "2017-09-28T21:03:54.052298"
+        for name in ("State", "Amenity"):
+            with open(os.path.join(self.tmp.name, name + ".json"), "w") as f:
+                json.dump({"{}.{}".format(name, i): {
+                    "__class__": name, "id": str(i), "name": "x" * 100,
+                    "created_at": date, "updated_at": date}
+                    for i in range(15000)}, f)
+        env = dict(os.environ, HBNB_FILE_SHARDS=self.tmp.name,
+                   HBNB_FILE_RELOAD_POOL="process",
+                   HBNB_FILE_RELOAD_WORKERS="2",
+                   PYTHONPATH=os.getcwd())
+        env.pop("HBNB_TYPE_STORAGE", None)
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "from models import storage; print(storage.counts()['Amenity'])"],
+            cwd=self.tmp.name, env=env, capture_output=True, text=True,
+            timeout=60)
+        self.assertEqual(result.stdout.strip(), "15000", result.stderr)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageMultiprocess(unittest.TestCase):
+    """Test the FileStorage multiprocess mode"""
+    def setUp(self):
+        """Points the storage to a temporary file shared by processes"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__multiprocess,
+                      FileStorage._FileStorage__generation,
+                      FileStorage._FileStorage__watch)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = os.path.join(self.tmp.name,
+                                                           "file.json")
+        FileStorage._FileStorage__multiprocess = True
+        FileStorage._FileStorage__watch = None
+        self.storage = FileStorage()
+        self.context = multiprocessing.get_context("fork")
+
+    def tearDown(self):
+        """Restores the storage"""
+        if FileStorage._FileStorage__watch is not None:
+            os.close(FileStorage._FileStorage__watch[1])
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__multiprocess,
+         FileStorage._FileStorage__generation,
+         FileStorage._FileStorage__watch) = self.saved
+        self.tmp.cleanup()
+
+    def run_child(self, target, *args):
+        """Runs target in a forked process and waits for it"""
+        child = self.context.Process(target=target, args=args)
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+
+    def test_concurrent_writers(self):
+        """Test that saves from several processes are all kept"""
+        def create(name):
+            """Saves a few states"""
+            for i in range(10):
+                self.storage.new(State(name=name))
+                self.storage.save()
+        children = [self.context.Process(target=create, args=(str(i),))
+                    for i in range(3)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join()
+            self.assertEqual(child.exitcode, 0)
+        self.assertEqual(self.storage.count(State), 30)
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertEqual(len(json.load(f)), 30)
+
+    def test_refresh_applies_other_saves(self):
+        """Test that changes and deletions of another process are seen,
+        and local changes not saved yet are kept"""
+        states = [State(name="Oregon"), State(name="Nevada")]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+
+        def change():
+            """Renames one state and deletes the other"""
+            self.storage.get(State, states[0].id).name = "Utah"
+            self.storage.delete(self.storage.get(State, states[1].id))
+            self.storage.save()
+        self.run_child(change)
+        local = State(name="Idaho")
+        self.storage.new(local)
+        self.assertEqual(self.storage.get(State, states[0].id).name, "Utah")
+        self.assertIsNone(self.storage.get(State, states[1].id))
+        self.assertIs(self.storage.get(State, local.id), local)
+        self.storage.save()
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_refresh_without_changes(self):
+        """Test that nothing is read when no other process saved"""
+        self.storage.new(State(name="Oregon"))
+        self.storage.save()
+        with mock.patch.object(FileStorage, "_FileStorage__read") as read:
+            self.storage.refresh()
+            self.storage.close()
+            read.assert_not_called()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageClose(unittest.TestCase):
+    """Test that FileStorage.close only applies the changed records"""
+    def setUp(self):
+        """Saves a few objects to a temporary file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = os.path.join(self.tmp.name,
+                                                           "file.json")
+        self.storage = FileStorage()
+        self.states = [State(name=str(i)) for i in range(3)]
+        for state in self.states:
+            self.storage.new(state)
+        self.storage.save()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path) = self.saved
+        self.tmp.cleanup()
+
+    def test_close_without_changes(self):
+        """Test that close reads nothing when the file did not change"""
+        with mock.patch.object(file_storage, "read_entries") as read:
+            self.storage.close()
+            read.assert_not_called()
+
+    def test_close_applies_changed_records(self):
+        """Test that close builds the changed records only, removes the
+        deleted ones and keeps the local changes not saved yet"""
+        path = FileStorage._FileStorage__file_path
+        with open(path) as f:
+            js = json.load(f)
+        js["State." + self.states[0].id]["name"] = "Oregon"
+        del js["State." + self.states[1].id]
+        with open(path, "w") as f:
+            json.dump(js, f)
+        local = State(name="Nevada")
+        self.storage.new(local)
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, self.states[0].id).name,
+                         "Oregon")
+        self.assertIsNone(self.storage.get(State, self.states[1].id))
+        self.assertIs(self.storage.get(State, self.states[2].id),
+                      self.states[2])
+        self.assertIs(self.storage.get(State, local.id), local)
+
+    def test_close_during_save(self):
+        """Test that close does not wait for a save being written, and
+        applies the changes found meanwhile at the next close"""
+        path = FileStorage._FileStorage__file_path
+        with open(path) as f:
+            js = json.load(f)
+        js["State." + self.states[0].id]["name"] = "Oregon"
+        with open(path, "w") as f:
+            json.dump(js, f)
+        writing = threading.Event()
+        done = threading.Event()
+
+        def write():
+            """holds the write lock as a save being written does"""
+            with FileStorage._FileStorage__write_lock:
+                writing.set()
+                done.wait(10)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writing.wait(10)
+        try:
+            self.storage.close()
+            self.assertEqual(self.storage.get(State, self.states[0].id).name,
+                             "0")
+        finally:
+            done.set()
+            writer.join()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, self.states[0].id).name,
+                         "Oregon")
+
 
 class TestFileStorageGetandCount(unittest.TestCase):
     """Test the FileStorage class get and count methods """
@@ -162,6 +1092,14 @@ class TestFileStorageGetandCount(unittest.TestCase):
         state1 = self.storage.get(State, "12345678")
         self.assertTrue(state1 is None)
 
+    @unittest.skipIf(models.storage_t == 'db', "not testing db storage")
+    def test_get_without_cls(self):
+        """Test that get() finds an object by id when cls is None"""
+        self.assertIs(self.storage.get(None, self.city.id), self.city)
+        self.assertIs(self.storage.get("City", self.city.id), self.city)
+        self.assertIsNone(self.storage.get(State, self.city.id))
+        self.assertIsNone(self.storage.get("Foo", self.city.id))
+
     @unittest.skipIf(models.storage_t == 'db', "not testing db storage")
     def test_count_with_cls(self):
         """test that count() returns the number of objects
@@ -175,6 +1113,15 @@ class TestFileStorageGetandCount(unittest.TestCase):
         num_objs = self.storage.count()
         self.assertTrue(type(num_objs) == int)
 
+    @unittest.skipIf(models.storage_t == 'db', "not testing db storage")
+    def test_counts(self):
+        """Test that counts returns the count of every class"""
+        counts = self.storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name in classes:
+            self.assertEqual(counts[name], self.storage.count(name))
+        self.assertEqual(sum(counts.values()), self.storage.count())
+
     @classmethod
     def tearDownClass(cls):
         """ Cleans up at the end of the unit tests """
@@ -182,8 +1129,7 @@ class TestFileStorageGetandCount(unittest.TestCase):
             file.write("{}")
         cls.storage.close()
 
-    @unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db',
-                     "not testing file storage")
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_count(self):
         storage = FileStorage()
         initial_length = len(storage.all())
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""
+Contains the TestMemoryStorageDocs and TestMemoryStorage classes
+"""
+
+import inspect
+import models
+from models.engine import memory_storage
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.state import State
+import os
+import pep8
+import tempfile
+import unittest
+MemoryStorage = memory_storage.MemoryStorage
+
+
+class TestMemoryStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of MemoryStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.ms_f = inspect.getmembers(MemoryStorage, inspect.isfunction)
+
+    def test_pep8_conformance_memory_storage(self):
+        """Test that models/engine/memory_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/memory_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_memory_storage(self):
+        """Test tests/test_models/test_memory_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_memory_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_memory_storage_module_docstring(self):
+        """Test for the memory_storage.py module docstring"""
+        self.assertIsNot(memory_storage.__doc__, None,
+                         "memory_storage.py needs a docstring")
+        self.assertTrue(len(memory_storage.__doc__) >= 1,
+                        "memory_storage.py needs a docstring")
+
+    def test_memory_storage_class_docstring(self):
+        """Test for the MemoryStorage class docstring"""
+        self.assertIsNot(MemoryStorage.__doc__, None,
+                         "MemoryStorage class needs a docstring")
+        self.assertTrue(len(MemoryStorage.__doc__) >= 1,
+                        "MemoryStorage class needs a docstring")
+
+    def test_ms_func_docstrings(self):
+        """Test for the presence of docstrings in MemoryStorage methods"""
+        for func in self.ms_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing memory storage")
+class TestMemoryStorage(unittest.TestCase):
+    """Test the MemoryStorage class"""
+    def setUp(self):
+        """Points the storage at a file that must never be written"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = (FileStorage._FileStorage__objects,
+                      FileStorage._FileStorage__file_path)
+        self.path = os.path.join(self.tmp.name, "file.json")
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__file_path = self.path
+        self.storage = MemoryStorage()
+
+    def tearDown(self):
+        """Restores the storage"""
+        (FileStorage._FileStorage__objects,
+         FileStorage._FileStorage__file_path) = self.saved
+        FileStorage._FileStorage__pending.clear()
+        self.tmp.cleanup()
+
+    def test_save_writes_nothing(self):
+        """Test that save keeps the objects without writing a file"""
+        state = State(name="California")
+        self.storage.new(state)
+        future = self.storage.save()
+        self.assertTrue(future.done())
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(FileStorage._FileStorage__pending, {})
+        self.storage.close()
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, state.id), state)
+
+    def test_indexes_and_queries(self):
+        """Test that find, query and count read the objects kept"""
+        state = State(name="Nevada")
+        self.storage.new(state)
+        cities = [City(state_id=state.id, name=str(i)) for i in range(3)]
+        for city in cities:
+            self.storage.new(city)
+        self.storage.save()
+        self.assertCountEqual(self.storage.find(City, state_id=state.id),
+                              cities)
+        query = self.storage.query(City).filter(state_id=state.id)
+        self.assertEqual(query.order_by("name").first(), cities[0])
+        self.assertEqual(self.storage.count(City), 3)
+        self.storage.delete(cities[0])
+        self.storage.save()
+        self.assertEqual(self.storage.counts()["City"], 2)
+        self.assertIsNone(self.storage.get(City, cities[0].id))
+
+    def test_save_discards_changes(self):
+        """Test that save forgets the objects changed and removed"""
+        state = State(name="Utah")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Idaho"
+        self.storage.delete(state)
+        self.storage.save()
+        self.assertEqual(FileStorage._FileStorage__pending, {})
+        self.assertEqual(FileStorage._FileStorage__dirty, set())
+        self.assertEqual(FileStorage._FileStorage__removed, set())
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+"""
+Contains the TestMigrateDocs, TestMigrate and TestMigrateSchema classes
+"""
+
+import inspect
+import json
+import models
+from models.engine import migrate
+import os
+import pep8
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestMigrateDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the migrate module"""
+    def test_pep8_conformance_migrate(self):
+        """Test that models/engine/migrate.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/migrate.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_migrate(self):
+        """Test tests/test_models/test_engine/test_migrate.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_migrate.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_migrate_module_docstring(self):
+        """Test for the migrate.py module docstring"""
+        self.assertIsNot(migrate.__doc__, None,
+                         "migrate.py needs a docstring")
+        self.assertTrue(len(migrate.__doc__) >= 1,
+                        "migrate.py needs a docstring")
+
+    def test_migrate_func_docstrings(self):
+        """Test for the presence of docstrings in migrate functions"""
+        for name, func in inspect.getmembers(migrate, inspect.isfunction):
+            if func.__module__ != migrate.__name__:
+                continue
+            self.assertIsNot(func.__doc__, None,
+                             "{:s} function needs a docstring".format(name))
+            self.assertTrue(len(func.__doc__) >= 1,
+                            "{:s} function needs a docstring".format(name))
+
+
+class TestMigrate(unittest.TestCase):
+    """Test the migrations between storage files and databases"""
+    def setUp(self):
+        """Writes a storage file of a few related objects"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "file.json")
+        self.url = "sqlite:///" + os.path.join(self.tmp.name, "hbnb.db")
+        self.checkpoint = os.path.join(self.tmp.name, "hbnb.db.migrate")
+        date = "2017-09-28T21:03:54.052298"
+        records = {}
+
+        def add(cls, id, **kwargs):
+            """adds the record of an object of the class called cls"""
+            kwargs.update(__class__=cls, id=id, created_at=date,
+                          updated_at=date)
+            records["{}.{}".format(cls, id)] = kwargs
+
+        add("Amenity", "a1", name="Wifi")
+        add("User", "u1", email="a@b.c", password="5f4dcc3b5aa765d6")
+        for i in range(5):
+            add("State", "s{}".format(i), name="State {}".format(i))
+            add("City", "c{}".format(i), state_id="s{}".format(i),
+                name="City {}".format(i))
+            add("Place", "p{}".format(i), city_id="c{}".format(i),
+                user_id="u1", name="Place {}".format(i), max_guest=i,
+                amenity_ids=["a1"])
+            add("Review", "r{}".format(i), place_id="p{}".format(i),
+                user_id="u1", text="Nice")
+        with open(self.source, "w") as f:
+            json.dump(records, f)
+        self.records = records
+
+    def tearDown(self):
+        """Removes the files of the migrations"""
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test that a file copied to a database and back keeps every
+        object, the amenities of the places included"""
+        self.assertEqual(migrate.migrate(self.source, self.url, 2,
+                                         self.checkpoint), 27)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        copy = os.path.join(self.tmp.name, "copy.jsonl")
+        self.assertEqual(migrate.migrate(self.url, copy), 22)
+        with open(copy) as f:
+            records = {"{}.{}".format(r["__class__"], r["id"]): r
+                       for r in map(json.loads, f)}
+        self.assertEqual(set(records), set(self.records))
+        self.assertEqual(records["Place.p3"]["amenity_ids"], ["a1"])
+        self.assertEqual(records["Place.p3"]["max_guest"], 3)
+        self.assertEqual(records["User.u1"]["password"], "5f4dcc3b5aa765d6")
+        self.assertEqual(records["City.c2"]["created_at"],
+                         self.records["City.c2"]["created_at"])
+
+    def test_resume(self):
+        """Test that a migration interrupted after a batch was written but
+        before its checkpoint was saved resumes without copying it twice"""
+        dump = migrate.dump
+        calls = []
+
+        def crash(path, checkpoint):
+            """saves the checkpoint until the third batch is written"""
+            calls.append(path)
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+            dump(path, checkpoint)
+
+        with mock.patch.object(migrate, "dump", crash):
+            with self.assertRaises(RuntimeError):
+                migrate.migrate(self.source, self.url, 2, self.checkpoint)
+        with open(self.checkpoint) as f:
+            self.assertEqual(sum(table["rows"]
+                                 for table in json.load(f).values()), 4)
+        self.assertEqual(migrate.migrate(self.source, self.url, 2,
+                                         self.checkpoint), 22)
+        copy = os.path.join(self.tmp.name, "copy.json")
+        self.assertEqual(migrate.migrate(self.url, copy), 22)
+        with open(copy) as f:
+            self.assertEqual(set(json.load(f)), set(self.records))
+
+    def test_read_once(self):
+        """Test that a storage file is read once for every table"""
+        with mock.patch.object(migrate, "read_records",
+                               wraps=migrate.read_records) as read:
+            self.assertEqual(migrate.migrate(self.source, self.url, 2), 27)
+        self.assertEqual(read.call_count, 1)
+
+    def test_journal(self):
+        """Test that the journal of a storage file is replayed on top of
+        it, up to an incomplete last entry"""
+        journal = self.source + ".log"
+        city = dict(self.records["City.c1"], name="Renamed")
+        user = dict(self.records["User.u1"], id="u2", email="d@e.f")
+        with open(journal, "w") as f:
+            for entry in ({"op": "new", "key": "City.c1", "obj": city},
+                          {"op": "new", "key": "User.u2", "obj": user},
+                          {"op": "delete", "key": "Review.r0"}):
+                f.write(json.dumps(entry) + "\n")
+            f.write('{"op": "delete", "key": "Sta')
+        copy = os.path.join(self.tmp.name, "copy.json")
+        self.assertEqual(migrate.migrate(self.source, copy,
+                                         journal=journal), 22)
+        self.assertEqual(migrate.migrate(self.source, self.url,
+                                         journal=journal), 27)
+        self.assertEqual(migrate.migrate(self.url, copy), 22)
+        with open(copy) as f:
+            records = json.load(f)
+        self.assertEqual(records["City.c1"]["name"], "Renamed")
+        self.assertIn("User.u2", records)
+        self.assertNotIn("Review.r0", records)
+        self.assertIn("State.s0", records)
+        os.remove(self.source)
+        self.assertEqual(migrate.migrate(self.source, copy,
+                                         journal=journal), 2)
+
+    def test_shards(self):
+        """Test that a sharded storage is read from the file of each
+        class"""
+        shards = os.path.join(self.tmp.name, "shards")
+        os.mkdir(shards)
+        for name in ("Amenity", "City", "Place", "Review", "State", "User"):
+            with open(os.path.join(shards, name + ".json"), "w") as f:
+                json.dump({key: record for key, record in self.records.items()
+                           if record["__class__"] == name}, f)
+        self.assertEqual(migrate.migrate(shards, self.url, 2), 27)
+        copy = os.path.join(self.tmp.name, "copy.jsonl")
+        self.assertEqual(migrate.migrate(self.url, copy), 22)
+        self.assertEqual(migrate.migrate(shards, copy), 22)
+        with open(copy) as f:
+            self.assertEqual({"{}.{}".format(r["__class__"], r["id"])
+                              for r in map(json.loads, f)},
+                             set(self.records))
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestMigrateSchema(unittest.TestCase):
+    """Test that the tables of the migrations match the mapped models"""
+    def ddl(self, metadata):
+        """returns the SQLite statements creating the tables of metadata,
+        and the Python defaults of their columns (the type of the values of
+        the callable ones)"""
+        dialect = sqlite.dialect()
+        statements = {}
+        for table in metadata.sorted_tables:
+            defaults = {}
+            for column in table.columns:
+                if column.default is None:
+                    continue
+                if column.default.is_callable:
+                    value = type(column.default.arg(None))
+                else:
+                    value = column.default.arg
+                defaults[column.name] = value
+            statements[table.name] = (
+                str(CreateTable(table).compile(dialect=dialect)),
+                sorted(str(CreateIndex(index).compile(dialect=dialect))
+                       for index in table.indexes),
+                defaults)
+        return statements
+
+    def test_tables_match_models(self):
+        """Test that migrate.metadata defines the tables of Base.metadata"""
+        self.assertEqual(self.ddl(migrate.metadata),
+                         self.ddl(models.base_model.Base.metadata))
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+"""
+Contains the TestSQLiteStorageDocs and TestSQLiteStorage classes
+"""
+
+import inspect
+import models
+from models.engine import sqlite_storage
+from models.city import City
+from models.state import State
+import pep8
+from sqlalchemy import event
+import threading
+import unittest
+SQLiteStorage = sqlite_storage.SQLiteStorage
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SQLiteStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.sqls_f = inspect.getmembers(SQLiteStorage, inspect.isfunction)
+
+    def test_pep8_conformance_sqlite_storage(self):
+        """Test that models/engine/sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_sqlite_storage(self):
+        """Test tests/test_models/test_sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_sqlite_storage_module_docstring(self):
+        """Test for the sqlite_storage.py module docstring"""
+        self.assertIsNot(sqlite_storage.__doc__, None,
+                         "sqlite_storage.py needs a docstring")
+        self.assertTrue(len(sqlite_storage.__doc__) >= 1,
+                        "sqlite_storage.py needs a docstring")
+
+    def test_sqlite_storage_class_docstring(self):
+        """Test for the SQLiteStorage class docstring"""
+        self.assertIsNot(SQLiteStorage.__doc__, None,
+                         "SQLiteStorage class needs a docstring")
+        self.assertTrue(len(SQLiteStorage.__doc__) >= 1,
+                        "SQLiteStorage class needs a docstring")
+
+    def test_sqls_func_docstrings(self):
+        """Test for the presence of docstrings in SQLiteStorage methods"""
+        for func in self.sqls_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(models.engine_t != 'sqlite', "not testing sqlite storage")
+class TestSQLiteStorageMethods(unittest.TestCase):
+    """Test the SQLiteStorage class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up a storage on the database file of models.storage"""
+        cls.storage = SQLiteStorage()
+        cls.storage.reload()
+        cls.state = State(name="California")
+        cls.storage.new(cls.state)
+        cls.storage.save()
+        cls.city = City(state_id=cls.state.id, name="San Francisco")
+        cls.storage.new(cls.city)
+        cls.storage.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        """ Cleans up at the end of the unit tests """
+        cls.storage.close()
+
+    def test_wal_mode(self):
+        """Test that the connections use write-ahead logging"""
+        with self.storage._DBStorage__engine.connect() as connection:
+            mode = connection.exec_driver_sql("PRAGMA journal_mode")
+            self.assertEqual(mode.scalar(), "wal")
+
+    def test_get_and_count(self):
+        """Test that get and count read the objects saved"""
+        self.assertIs(self.storage.get(City, self.city.id), self.city)
+        self.assertEqual(self.storage.find(City, state_id=self.state.id),
+                         [self.city])
+        self.assertGreaterEqual(self.storage.count(State), 1)
+
+    def test_all(self):
+        """Test that all returns the objects of every class or of one"""
+        objects = self.storage.all()
+        self.assertIn("City." + self.city.id, objects)
+        self.assertIn("State." + self.state.id, objects)
+        self.assertEqual(list(self.storage.all(City)),
+                         [key for key in objects if key.startswith("City.")])
+        self.assertIs(self.storage.all("City")["City." + self.city.id],
+                      self.city)
+        self.assertEqual(self.storage.all(int), {})
+
+    def test_query_load(self):
+        """Test that load fetches the related objects with a bounded number
+        of queries, whichever the strategy"""
+        engine = self.storage._DBStorage__engine
+        statements = []
+
+        def count(*args):
+            """counts the statements sent to the database"""
+            statements.append(args[2])
+
+        query = self.storage.query(State).filter(id=self.state.id)
+        joined = query.load("cities", strategy="joined")
+        for loaded, expected in ((query.load("cities.places"), 3),
+                                 (joined.load("cities.places"), 2),
+                                 (query.load("cities.places",
+                                             strategy="joined"), 1)):
+            self.storage.close()
+            del statements[:]
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                states = loaded.all()
+                names = [city.name for state in states
+                         for city in state.cities]
+                [city.places for state in states for city in state.cities]
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+            self.assertEqual(names, ["San Francisco"])
+            self.assertEqual(len(statements), expected)
+        with self.assertRaises(ValueError):
+            query.load("cities", strategy="lazy")
+
+    def test_concurrent_readers(self):
+        """Test that other threads read the committed objects while a
+        write is in progress"""
+        state = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.new(State(name="Utah"))
+        self.storage.delete(state)
+        self.storage.count(State)
+        self.assertIsNone(self.storage.get(State, state.id))
+        found = []
+
+        def read():
+            """reads the state from the session of another thread"""
+            found.append(self.storage.get(State, state.id) is not None)
+            self.storage.close()
+
+        threads = [threading.Thread(target=read) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.storage.save()
+        self.assertEqual(found, [True] * 4)
+
+    def test_new_many_and_delete_many(self):
+        """Test that new_many and delete_many are committed by one save"""
+        count = self.storage.count(State)
+        states = [State(name=str(i)) for i in range(5)]
+        self.storage.new_many(states)
+        self.storage.save()
+        self.assertEqual(self.storage.count(State), count + 5)
+        self.storage.delete_many(states[:3])
+        self.storage.save()
+        self.assertEqual(self.storage.count(State), count + 2)
+        self.assertIsNone(self.storage.get(State, states[0].id))
+        self.assertIs(self.storage.get(State, states[4].id), states[4])